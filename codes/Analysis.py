@@ -1,7 +1,6 @@
 import math
 import numpy as np
 import matplotlib.pyplot as plt
-import tensorflow as tf
 import pandas as pd
 import seaborn as sns
 
@@ -30,6 +29,11 @@ from sklearn.feature_selection import RFECV
 import warnings
 warnings.filterwarnings('ignore')
 
+from labels import lookup
+from tickets import parse_tickets
+from tuning import grid_sweep, random_search, successive_halving
+from titles import SOCIAL_TITLES, parse_titles, group_titles
+
 
 
 def plot_correlation_map( df ):
@@ -115,31 +119,10 @@ def preprocessing():
 
     title = pd.DataFrame()
     # extract the title from each name
-    title[ 'Title' ] = full[ 'Name' ].map( lambda name: name.split( ',' )[1].split( '.' )[0].strip() )
-    
-    Title_Dictionary = {
-                    "Capt":       "Officer",
-                    "Col":        "Officer",
-                    "Major":      "Officer",
-                    "Jonkheer":   "Royalty",
-                    "Don":        "Royalty",
-                    "Sir" :       "Royalty",
-                    "Dr":         "Officer",
-                    "Rev":        "Officer",
-                    "the Countess":"Royalty",
-                    "Dona":       "Royalty",
-                    "Mme":        "Mrs",
-                    "Mlle":       "Miss",
-                    "Ms":         "Mrs",
-                    "Mr" :        "Mr",
-                    "Mrs" :       "Mrs",
-                    "Miss" :      "Miss",
-                    "Master" :    "Master",
-                    "Lady" :      "Royalty"
-
-                    }
-
-    title[ 'Title' ] = title.Title.map( Title_Dictionary )
+    title[ 'Title' ] = parse_titles( full[ 'Name' ] )
+
+    # titles.SOCIAL_TITLES: Mr / Mrs / Miss / Master / Officer / Royalty
+    title[ 'Title' ] = group_titles( title.Title, SOCIAL_TITLES, strict=True ).astype( object )
     title = pd.get_dummies( title.Title )
     # print(title.head())
 
@@ -154,21 +137,9 @@ def preprocessing():
     cabin = pd.get_dummies( cabin['Cabin'] , prefix = 'Cabin' )
 
 
-    # a function that extracts each prefix of the ticket, returns 'XXX' if no prefix (i.e the ticket is a digit)
-    def cleanTicket( ticket ):
-        ticket = ticket.replace( '.' , '' )
-        ticket = ticket.replace( '/' , '' )
-        ticket = ticket.split()
-        ticket = map( lambda t : t.strip() , ticket )
-        ticket = list(filter( lambda t : not t.isdigit() , ticket ))
-        if len( ticket ) > 0:
-            return ticket[0]
-        else: 
-            return 'XXX'
-
     ticket = pd.DataFrame()
-    # Extracting dummy variables from tickets:
-    ticket[ 'Ticket' ] = full[ 'Ticket' ].map( cleanTicket )
+    # Extracting dummy variables from tickets, the prefix is 'XXX' if there is none (i.e the ticket is a digit)
+    ticket[ 'Ticket' ] = parse_tickets( full[ 'Ticket' ] , missing = 'XXX' )[ 'prefix' ]
     ticket = pd.get_dummies( ticket[ 'Ticket' ] , prefix = 'Ticket' )
 
 
@@ -187,9 +158,7 @@ def preprocessing():
     Y_train = train.Survived
     X_test = full_X[891:]
     
-    Y_test = pd.read_csv("./datasets/answer.csv")
-    Y_test = Y_test.survived
-    Y_test = Y_test[891:]
+    Y_test = pd.Series(lookup(test.PassengerId), index=X_test.index, name='survived')
 
     return X_train, Y_train, X_test, Y_test
     
@@ -214,7 +183,7 @@ X_train, Y_train, X_test, Y_test = preprocessing()
 # plot_model_var_imp(model, X_train, Y_train)
 
 
-def tunning():
+def tunning(search='halving', workers=1, seconds=None):
     model = RandomForestClassifier()
     parameters = {'n_estimators': [4, 6, 9, 50, 100], 
                 'max_features': ['log2', 'sqrt','auto'], 
@@ -224,13 +193,19 @@ def tunning():
                 'min_samples_leaf': [1,5,8]
                 }
                 
-    acc_scorer = make_scorer(accuracy_score)
-
-    grid_obj = GridSearchCV(model, parameters, scoring=acc_scorer)
-    grid_obj = grid_obj.fit(X_train, Y_train)
-
-    # Set the model to the best combination of parameters
-    model = grid_obj.best_estimator_
+    # 'grid': same search as GridSearchCV(model, parameters, scoring=accuracy), but every combination of
+    # the other parameters fits one forest of 100 trees per fold for all the n_estimators values
+    # 'random' / 'halving': see tuning.py, stop after `seconds`, every evaluation is kept in
+    # ./datasets/cache/tuning so running it again resumes where it stopped
+    if search == 'grid':
+        model, results = grid_sweep(model, parameters, X_train, Y_train, refit=False)
+    elif search == 'random':
+        model, results = random_search(model, parameters, X_train, Y_train, n_iter=100, workers=workers,
+                                       seconds=seconds, refit=False)
+    else:
+        model, results = successive_halving(model, parameters, X_train, Y_train, workers=workers,
+                                            seconds=seconds, refit=False)
+    print(results.head())
 
     # Fit the best algorithm to the data. 
     model.fit( X_train , Y_train )
@@ -0,0 +1,102 @@
+import time
+
+import numpy as np
+
+
+def _examples(array, axis):
+    array = np.asarray(array)
+    return array.shape[axis if array.ndim > 1 else 0]
+
+
+def _batch(buffer, n, axis):
+    # the first n examples of a buffer
+    return buffer[:n] if axis == 0 or buffer.ndim == 1 else buffer[:, :n]
+
+
+def batch_buffers(X, Y, batch_size=64, axis=0):
+    """
+    The two reusable arrays mini_batches() gathers into, shaped like X and Y
+    with batch_size examples, in their dtypes.
+    """
+    buffers = []
+    for array in (np.asarray(X), np.asarray(Y)):
+        shape = list(array.shape)
+        shape[axis if array.ndim > 1 else 0] = batch_size
+        buffers.append(np.empty(shape, dtype=array.dtype))
+    return tuple(buffers)
+
+
+def mini_batches(X, Y, batch_size=64, seed=0, drop_last=False, shuffle=True, axis=0, buffers=None):
+    """
+    Random mini-batches of (X, Y), one at a time.
+
+    Only an index permutation is shuffled (np.random.RandomState(seed), the
+    same permutation as the old np.random.seed(seed); np.random.permutation(m)).
+    The examples of every batch are gathered into one preallocated buffer per
+    array, so the memory used is one batch whatever the size of the data set.
+    The yielded arrays are views of those buffers: they are overwritten by the
+    next batch, copy them to keep them.
+
+    Arguments:
+    X, Y -- examples as rows (axis=0), or as columns (axis=1: X of shape (input size, m), Y of shape (1, m))
+    seed -- seed of this epoch's shuffle (e.g. seed + epoch), None: not reproducible
+    drop_last -- skip the last batch when it is smaller than batch_size
+    buffers -- from batch_buffers(), to reuse them across epochs
+    Yields:
+    (mini_batch_X, mini_batch_Y) -- in the layout of X and Y
+    """
+    X, Y = np.asarray(X), np.asarray(Y)
+    m = _examples(X, axis)
+    if _examples(Y, axis) != m:
+        raise ValueError("X has {0} examples, Y {1}".format(m, _examples(Y, axis)))
+    x_buffer, y_buffer = buffers if buffers is not None else batch_buffers(X, Y, batch_size, axis)
+
+    order = np.random.RandomState(seed).permutation(m) if shuffle else np.arange(m)
+    end = m - m % batch_size if drop_last else m
+    for start in range(0, end, batch_size):
+        index = order[start:start + batch_size]
+        n = len(index)
+        mini_batch_X, mini_batch_Y = _batch(x_buffer, n, axis), _batch(y_buffer, n, axis)
+        # take() reads the source in place; only a short last batch goes through a batch sized temporary
+        np.take(X, index, axis=axis if X.ndim > 1 else 0, out=mini_batch_X, mode='clip')
+        np.take(Y, index, axis=axis if Y.ndim > 1 else 0, out=mini_batch_Y, mode='clip')
+        yield mini_batch_X, mini_batch_Y
+
+
+def epochs(X, Y, num_epochs, batch_size=64, seed=0, drop_last=False, axis=0):
+    """
+    (epoch, batches) for every epoch, batches being mini_batches() seeded with
+    seed + epoch and sharing one set of buffers.
+    """
+    buffers = batch_buffers(X, Y, batch_size, axis)
+    for epoch in range(num_epochs):
+        yield epoch, mini_batches(X, Y, batch_size, None if seed is None else seed + epoch, drop_last,
+                                  axis=axis, buffers=buffers)
+
+
+def benchmark(m=10 ** 6, n_x=8, batch_size=64):
+    import tracemalloc
+
+    rng = np.random.RandomState(0)
+    X = rng.rand(n_x, m)
+    Y = (rng.rand(1, m) > 0.5).astype(np.float64)
+
+    def shuffled_copy():
+        # the old random_mini_batches: shuffled copies of X and Y, then a list of views
+        permutation = list(np.random.RandomState(0).permutation(m))
+        shuffled_X, shuffled_Y = X[:, permutation], Y[:, permutation]
+        return [(shuffled_X[:, k:k + batch_size], shuffled_Y[:, k:k + batch_size]) for k in range(0, m, batch_size)]
+
+    for name, run in [('shuffled copy + list', lambda: sum(x.sum() for x, y in shuffled_copy())),
+                      ('mini_batches', lambda: sum(x.sum() for x, y in mini_batches(X, Y, batch_size, axis=1)))]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        run()
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print("{0:22} {1:.2f}s   peak {2:.1f} MB (X is {3:.1f} MB)".format(name, seconds, peak / 2 ** 20, X.nbytes / 2 ** 20))
+
+
+if __name__ == '__main__':
+    benchmark()
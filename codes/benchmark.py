@@ -0,0 +1,222 @@
+import datetime
+import json
+import multiprocessing
+import os
+import pickle
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+
+from cache import array_digest
+from validation import _name, _named, _peak_memory
+
+
+BENCHMARK_DIR = "./datasets/benchmarks"
+REPORT_PATH = os.path.join(BENCHMARK_DIR, "report.json")
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+BATCH_SIZES = (1, 100, 10000)
+
+# changes that count as a regression in check(): absolute for accuracy, relative otherwise
+TOLERANCES = {'test_accuracy': 0.01, 'fit_time': 0.5, 'p50_ms': 0.5, 'model_bytes': 0.25}
+
+
+def _seeded(model, seed):
+    # a fixed random_state wherever the model has one, so that two runs fit the same model
+    model = clone(model)
+    if seed is not None and 'random_state' in model.get_params():
+        model.set_params(random_state=seed)
+    return model
+
+
+def latency(model, X, batch_size, repeats=None, seed=0):
+    """
+    Predict latency of a fitted model on batches of batch_size rows, drawn
+    from the rows of X (with repetition when X is smaller).
+
+    Returns {'p50_ms', 'p99_ms', 'rows_per_s'} -- median and 99th percentile of
+    `repeats` timed calls (by default about 1s worth of rows, 5 to 200 calls),
+    and rows predicted per second at the median.
+    """
+    X = np.asarray(X)
+    rng = np.random.RandomState(seed)
+    batch = X[rng.randint(0, len(X), batch_size)]
+    repeats = repeats or int(np.clip(20000 // batch_size, 5, 200))
+    model.predict(batch)  # warm up
+    times = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        model.predict(batch)
+        times[i] = time.perf_counter() - start
+    p50, p99 = np.percentile(times, [50, 99])
+    return {'p50_ms': p50 * 1000, 'p99_ms': p99 * 1000, 'rows_per_s': batch_size / p50}
+
+
+def measure(model, x_train, y_train, x_test, y_test, batch_sizes=BATCH_SIZES, name=None):
+    """
+    One row of the report (model: name, the class name by default): fit time, train / test accuracy, latency at every
+    batch size (columns p50_ms_<size>, p99_ms_<size>, rows_per_s_<size>),
+    pickled size and peak resident memory of the process (bytes).
+    """
+    start = time.perf_counter()
+    model.fit(x_train, y_train)
+    row = {'model': name or _name(model), 'fit_time': time.perf_counter() - start,
+           'train_accuracy': accuracy_score(y_train, model.predict(x_train)),
+           'test_accuracy': accuracy_score(y_test, model.predict(x_test))}
+    for size in batch_sizes:
+        for key, value in latency(model, x_test, size).items():
+            row['{0}_{1}'.format(key, size)] = value
+    row['model_bytes'] = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    row['peak_rss'] = _peak_memory()
+    return row
+
+
+# matrices of the running run(), inherited by its forked processes instead of being pickled to them
+_shared = {}
+
+
+def _share(x_train, y_train, x_test, y_test):
+    _shared.update(x_train=x_train, y_train=y_train, x_test=x_test, y_test=y_test)
+
+
+def _measure_shared(model, batch_sizes, name):
+    return measure(model, _shared['x_train'], _shared['y_train'], _shared['x_test'], _shared['y_test'], batch_sizes, name)
+
+
+def run(models, x_train, y_train, x_test, y_test, batch_sizes=BATCH_SIZES, seed=0, isolate=True):
+    """
+    Benchmarks every model on the same matrices and returns the rows of the
+    report as a DataFrame indexed by model name.
+
+    models -- estimators (a list, named by class, then Class_2, Class_3... for
+              repeated classes) or a {name: estimator} dict
+
+    With isolate=True each model runs in a process of its own (forked, so
+    the matrices are inherited rather than pickled; only the model is sent),
+    which makes peak_rss that model's peak
+    rather than the high-water mark of everything that ran before it.
+    """
+    x_train, y_train = np.asarray(x_train), np.asarray(y_train)
+    x_test, y_test = np.asarray(x_test), np.asarray(y_test)
+    models = models if isinstance(models, dict) else _named(models)
+    rows = []
+    for name, model in models.items():
+        model = _seeded(model, seed)
+        if isolate:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            # the initializer arguments are inherited through fork, only the model is pickled
+            with ProcessPoolExecutor(1, mp_context=context, initializer=_share,
+                                     initargs=(x_train, y_train, x_test, y_test)) as executor:
+                rows.append(executor.submit(_measure_shared, model, batch_sizes, name).result())
+        else:
+            rows.append(measure(model, x_train, y_train, x_test, y_test, batch_sizes, name))
+    return pd.DataFrame(rows).set_index('model')
+
+
+def write_report(results, path=REPORT_PATH, data=None):
+    """
+    Writes the results of run() as JSON, with the library versions, the
+    machine and a digest of the data (data=(x_train, y_train, x_test, y_test))
+    so that a report is only compared with one made on the same features.
+    """
+    report = {'created': datetime.datetime.now().isoformat(timespec='seconds'),
+              'python': platform.python_version(), 'numpy': np.__version__,
+              'pandas': pd.__version__, 'sklearn': sklearn.__version__,
+              'machine': platform.machine(), 'processor': platform.processor(),
+              'data': array_digest(*data) if data is not None else None,
+              'models': results.reset_index().to_dict(orient='records')}
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def read_report(path):
+    with open(path) as f:
+        report = json.load(f)
+    report['models'] = pd.DataFrame(report['models']).set_index('model')
+    return report
+
+
+def check(results, baseline, tolerances=TOLERANCES, batch_sizes=BATCH_SIZES):
+    """
+    Regressions of results (a run() DataFrame) against a baseline report:
+    test accuracy lower by more than tolerances['test_accuracy'] (absolute),
+    fit time, median latency or model size higher by more than the relative
+    tolerance. Models missing from either side are skipped.
+
+    Returns a DataFrame (model, metric, baseline, current, change), empty when all is well.
+    """
+    before = baseline['models']
+    metrics = [('test_accuracy', 'test_accuracy'), ('fit_time', 'fit_time'), ('model_bytes', 'model_bytes')]
+    metrics += [('p50_ms_{0}'.format(size), 'p50_ms') for size in batch_sizes]
+    rows = []
+    for model in results.index.intersection(before.index):
+        for column, tolerance in metrics:
+            if column not in before.columns:
+                continue
+            old, new = before.loc[model, column], results.loc[model, column]
+            if column == 'test_accuracy':
+                change, worse = new - old, new < old - tolerances[tolerance]
+            else:
+                change = new / old - 1 if old > 0 else 0.0
+                worse = change > tolerances[tolerance]
+            if worse:
+                rows.append({'model': model, 'metric': column, 'baseline': old, 'current': new, 'change': change})
+    return pd.DataFrame(rows, columns=['model', 'metric', 'baseline', 'current', 'change'])
+
+
+def benchmark_models(models, x_train, y_train, x_test, y_test, report=REPORT_PATH, baseline=BASELINE_PATH,
+                     save_baseline=False, **kwargs):
+    """
+    run() + write_report() + check() against the baseline, if there is one.
+    save_baseline=True also makes this run the new baseline.
+
+    Returns:
+    results -- run() DataFrame
+    regressions -- check() DataFrame (empty without a baseline)
+    """
+    results = run(models, x_train, y_train, x_test, y_test, **kwargs)
+    data = (x_train, y_train, x_test, y_test)
+    write_report(results, report, data)
+    if save_baseline:
+        write_report(results, baseline, data)
+
+    regressions = pd.DataFrame(columns=['model', 'metric', 'baseline', 'current', 'change'])
+    if baseline is not None and os.path.exists(baseline) and not save_baseline:
+        stored = read_report(baseline)
+        if stored['data'] != array_digest(*data):
+            print("baseline {0} was made on other data, not compared".format(baseline))
+        else:
+            regressions = check(results, stored, batch_sizes=kwargs.get('batch_sizes', BATCH_SIZES))
+    return results, regressions
+
+
+if __name__ == '__main__':
+    import sys
+    from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, AdaBoostClassifier, ExtraTreesClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.naive_bayes import GaussianNB
+    from sklearn.neighbors import KNeighborsClassifier
+    from sklearn.svm import SVC
+    from labels import test_labels
+    from preprocessing import after_preprocessing
+
+    # the models of implementation.get_models()
+    models = [RandomForestClassifier(), GradientBoostingClassifier(), AdaBoostClassifier(), ExtraTreesClassifier(),
+              SVC(), LogisticRegression(), KNeighborsClassifier(), GaussianNB()]
+    data = after_preprocessing()
+    y_train = pd.read_csv('./datasets/train.csv').Survived
+    y_test = test_labels()
+    results, regressions = benchmark_models(models, data[:891], y_train, data[891:], y_test,
+                                            save_baseline='--baseline' in sys.argv)
+    with pd.option_context('display.width', 200, 'display.max_columns', 30):
+        print(results[['fit_time', 'train_accuracy', 'test_accuracy', 'p50_ms_1', 'p99_ms_1', 'p50_ms_100',
+                       'rows_per_s_10000', 'model_bytes', 'peak_rss']].round(4))
+        print(regressions if len(regressions) else "no regression")
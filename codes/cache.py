@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+
+CACHE_DIR = "./datasets/cache"
+
+
+def file_digest(paths):
+    # content hash of the given files (order matters)
+    sha = hashlib.sha1()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha.update(block)
+    return sha.hexdigest()
+
+
+def config_digest(config):
+    text = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def cache_key(paths, config):
+    """
+    Short key identifying a result derived from the given source files with
+    the given configuration: it changes as soon as either one changes.
+    """
+    sha = hashlib.sha1()
+    sha.update(file_digest(paths).encode('ascii'))
+    sha.update(config_digest(config).encode('ascii'))
+    return sha.hexdigest()[:16]
+
+
+def array_digest(*arrays):
+    # content hash of matrices / frames (values, shapes, and for pandas objects index and columns)
+    sha = hashlib.sha1()
+    for array in arrays:
+        if isinstance(array, (pd.DataFrame, pd.Series)):
+            sha.update(repr(array.columns.tolist() if isinstance(array, pd.DataFrame) else array.name).encode('utf-8'))
+            sha.update(pd.util.hash_pandas_object(array).to_numpy().tobytes())
+            continue
+        array = np.asarray(array)
+        sha.update(str((array.shape, array.dtype.str)).encode('ascii'))
+        if array.dtype == object:
+            sha.update(pd.util.hash_pandas_object(pd.DataFrame(array.reshape(len(array), -1))).to_numpy().tobytes())
+        else:
+            sha.update(np.ascontiguousarray(array).tobytes())
+    return sha.hexdigest()
+
+
+def estimator_key(model, *arrays):
+    """
+    Short key of a model fitted (and predicting) on the given data: changes with
+    the model class, any of its parameters or the content of any array.
+    """
+    config = {'class': type(model).__module__ + '.' + type(model).__name__, 'params': model.get_params()}
+    sha = hashlib.sha1()
+    sha.update(config_digest(config).encode('ascii'))
+    sha.update(array_digest(*arrays).encode('ascii'))
+    return sha.hexdigest()[:16]
+
+
+def _path(name, key, cache_dir):
+    return os.path.join(cache_dir, "{0}-{1}.pkl".format(name, key))
+
+
+def stored(name, key, cache_dir=CACHE_DIR):
+    return os.path.exists(_path(name, key, cache_dir))
+
+
+def save(name, key, result, cache_dir=CACHE_DIR):
+    path = _path(name, key, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)  # never leave a half written cache file behind
+
+
+def load(name, key, cache_dir=CACHE_DIR):
+    with open(_path(name, key, cache_dir), 'rb') as f:
+        return pickle.load(f)
+
+
+def load_or_build(name, key, build, cache_dir=CACHE_DIR):
+    """
+    Returns the pickled result stored under name/key, calling build() and
+    storing its result first if there is none yet.
+    """
+    if stored(name, key, cache_dir):
+        return load(name, key, cache_dir)
+
+    result = build()
+    save(name, key, result, cache_dir)
+    return result
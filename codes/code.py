@@ -3,6 +3,7 @@ import numpy as np
 # import seaborn as sns
 import matplotlib.pyplot as plt
 
+from labels import test_labels
 from preprocessing import after_preprocessing
 
 from sklearn.linear_model import LogisticRegression, Perceptron, SGDClassifier
@@ -41,8 +42,7 @@ gd.fit( x_train , y_train )
 print (gd.score( x_train , y_train ))
 
 y_pred = gd.predict(x_test)
-y_test = pd.read_csv("./datasets/labeled_test_set.csv")
-y_test = np.array(y_test.loc[:,'Survived']) 
+y_test = test_labels()
 print (gd.score( x_test , y_test ))
 
 
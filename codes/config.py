@@ -0,0 +1,33 @@
+TRAIN_PATH = "./datasets/train.csv"
+TEST_PATH = "./datasets/test.csv"
+LABELED_TEST_PATH = "./datasets/labeled_test_set.csv"  # made by make_verification.py
+
+# everything (besides the code itself) that decides the features of preprocessing.py and
+# pipeline.py, bump 'version' whenever the feature code changes
+PIPELINE_CONFIG = {
+    'version': 1,
+    'age_bins': (0, 20, 28, 38, 80),
+    'age_labels': (1, 2, 3, 4),
+    'fare_bins': (-1, 12, 31, 1000),
+    'fare_labels': (0, 1, 2),
+    'title_groups': {
+        'Rare': ['Lady', 'the Countess', 'Capt', 'Col', 'Don', 'Dr', 'Major', 'Rev', 'Sir', 'Jonkheer', 'Dona'],
+        'Female': ['Mme', 'Mrs', 'Mlle', 'Ms', 'Miss'],
+    },
+    'title_drop': ['Master'],
+    'ticket_groups': {
+        'AAA': ['SWPP', 'SC'],
+        'BBB': ['FCC'],
+        'CCC': ['SCAH', 'PP', 'PC'],
+        'DDD': ['CA', 'WEP'],
+        'EEE': ['LINE'],
+        'FFF': ['SOC', 'SOTONOQ'],
+        'GGG': ['WC', 'A5'],
+        'HHH': ['AS', 'CASOTON', 'SP', 'SOTONO2', 'SCA4', 'SOPP', 'SOP', 'FC', 'Fa', 'SCOW', 'A4'],
+    },
+    'ticket_drop': ['PPP', 'STONO', 'STONO2', 'SCParis', 'SCPARIS', 'XX',
+                    'A', 'AQ3', 'AQ4', 'C', 'LP', 'SCA3', 'STONOQ'],
+    'cabin_drop': ['A', 'C', 'F', 'G', 'T'],
+    'pclass_drop': [1, 2],
+    'age_sex_drop': [-4, -3, -2, -1, 2, 3, 4],
+}
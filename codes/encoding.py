@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy import sparse
+except ImportError:  # only needed for transform(..., sparse_output=True)
+    sparse = None
+
+
+class CategoricalEncoder(object):
+    """
+    One-hot encoder whose vocabulary is fixed at fit time.
+
+    Unlike pd.get_dummies the width of the output never depends on the batch:
+    categories listed in `drop` (or the first one with drop_first) get no column,
+    missing values encode to all zeros and values unseen at fit time go to a
+    trailing 'other' column (other=True) or to all zeros (other=False).
+    Columns are named like pd.get_dummies names them.
+    """
+
+    def __init__(self, prefix=None, drop=(), drop_first=False, other=False, dtype=np.uint8):
+        self.prefix = prefix
+        self.drop = list(drop)
+        self.drop_first = drop_first
+        self.other = other
+        self.dtype = dtype
+
+    def _name(self, category):
+        return category if self.prefix is None else "{0}_{1}".format(self.prefix, category)
+
+    def fit(self, values):
+        seen = sorted(pd.unique(pd.Series(values).dropna()))
+        kept = seen[1:] if self.drop_first else seen
+        self.categories_ = [v for v in kept if v not in self.drop]
+        self.columns_ = [self._name(v) for v in self.categories_]
+        if self.other:
+            self.columns_.append(self._name('other'))
+
+        # every value known at fit time (kept or dropped) and the column it goes to,
+        # the trailing -1 is picked by get_indexer's -1 for unknown values
+        dropped = [v for v in seen if v not in set(self.categories_)]
+        self._known = pd.Index(self.categories_ + dropped)
+        self._lookup = np.array(list(range(len(self.categories_))) + [-1] * len(dropped) + [-1])
+        self._column_of = dict(zip(self._known, self._lookup))
+        return self
+
+    @property
+    def width(self):
+        return len(self.columns_)
+
+    def codes(self, values):
+        # column of every value (-1: no column), one hash lookup per value
+        values = pd.Series(values) if not isinstance(values, pd.Series) else values
+        codes = self._known.get_indexer(values)
+        columns = self._lookup[codes]
+        if self.other:
+            columns[(codes == -1) & values.notna().to_numpy()] = self.width - 1
+        return columns
+
+    def code_one(self, value):
+        column = self._column_of.get(value)
+        if column is None:
+            if self.other and value == value and value is not None:
+                return self.width - 1
+            return -1
+        return column
+
+    def transform(self, values, sparse_output=False):
+        """
+        Returns the (n, width) one-hot matrix, dense uint8 or a scipy.sparse CSR matrix.
+        """
+        columns = self.codes(values)
+        rows = np.flatnonzero(columns >= 0)
+        if sparse_output:
+            if sparse is None:
+                raise ImportError("sparse_output=True needs scipy")
+            data = np.ones(len(rows), dtype=self.dtype)
+            return sparse.csr_matrix((data, (rows, columns[rows])), shape=(len(columns), self.width))
+        matrix = np.zeros((len(columns), self.width), dtype=self.dtype)
+        matrix[rows, columns[rows]] = 1
+        return matrix
+
+    def transform_frame(self, values):
+        # DataFrame version of transform, drop-in replacement for pd.get_dummies(values)
+        index = values.index if isinstance(values, pd.Series) else None
+        return pd.DataFrame(self.transform(values), columns=self.columns_, index=index)
+
+    def transform_chunks(self, chunks, sparse_output=False):
+        for chunk in chunks:
+            yield self.transform(chunk, sparse_output=sparse_output)
+
+    def fit_transform_frame(self, values):
+        return self.fit(values).transform_frame(values)
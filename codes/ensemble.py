@@ -1,6 +1,5 @@
 import pandas as pd
 import numpy as np
-import re
 import sklearn
 from sklearn.metrics import accuracy_score
 
@@ -22,6 +21,10 @@ from sklearn.ensemble import (RandomForestClassifier, AdaBoostClassifier,
 from sklearn.svm import SVC
 from sklearn.model_selection import KFold
 
+from labels import lookup
+from stacking import fit_meta, oof_predictions
+from titles import RARE_TITLES, parse_titles, group_titles
+
 
 
 train = pd.read_csv('./datasets/train.csv')
@@ -65,23 +68,10 @@ for dataset in full_data:
     dataset['Age'][np.isnan(dataset['Age'])] = age_null_random_list
     dataset['Age'] = dataset['Age'].astype(int)
 train['CategoricalAge'] = pd.cut(train['Age'], 5)
-# Define function to extract titles from passenger names
-def get_title(name):
-    title_search = re.search(' ([A-Za-z]+)\.', name)
-    # If the title exists, extract and return it.
-    if title_search:
-        return title_search.group(1)
-    return ""
-# Create a new feature Title, containing the titles of passenger names
-for dataset in full_data:
-    dataset['Title'] = dataset['Name'].apply(get_title)
-# Group all non-common titles into one single grouping "Rare"
+# Create a new feature Title, containing the titles of passenger names,
+# with all non-common titles grouped into one single grouping "Rare"
 for dataset in full_data:
-    dataset['Title'] = dataset['Title'].replace(['Lady', 'Countess','Capt', 'Col','Don', 'Dr', 'Major', 'Rev', 'Sir', 'Jonkheer', 'Dona'], 'Rare')
-
-    dataset['Title'] = dataset['Title'].replace('Mlle', 'Miss')
-    dataset['Title'] = dataset['Title'].replace('Ms', 'Miss')
-    dataset['Title'] = dataset['Title'].replace('Mme', 'Mrs')
+    dataset['Title'] = group_titles(parse_titles(dataset['Name']), RARE_TITLES).astype(object)
 
 for dataset in full_data:
     # Mapping Sex
@@ -132,6 +122,8 @@ ntest = test.shape[0]
 SEED = 0 # for reproducibility
 NFOLDS = 5 # set folds for out-of-fold prediction
 kfold = KFold(n_splits = 5, random_state = 0)
+WORKERS = 4 # (model, fold) pairs trained at the same time by get_oof / oof_predictions
+PROBA = False # out-of-fold survival probabilities instead of hard labels
 
 # Class to extend the Sklearn classifier
 class SklearnHelper(object):
@@ -152,23 +144,11 @@ class SklearnHelper(object):
         print(self.clf.fit(x,y).feature_importances_)
 
 
-def get_oof(clf, x_train, y_train, x_test):
-    oof_train = np.zeros((ntrain,))
-    oof_test = np.zeros((ntest,))
-    oof_test_skf = np.empty((NFOLDS, ntest))
-
-    for i, (train_index, test_index) in enumerate(kfold.split(train)):
-        x_tr = x_train[train_index]
-        y_tr = y_train[train_index]
-        x_te = x_train[test_index]
-
-        clf.train(x_tr, y_tr)
-
-        oof_train[test_index] = clf.predict(x_te)
-        oof_test_skf[i, :] = clf.predict(x_test)
-
-    oof_test[:] = oof_test_skf.mean(axis=0)
-    return oof_train.reshape(-1, 1), oof_test.reshape(-1, 1)
+def get_oof(clf, x_train, y_train, x_test, proba=PROBA):
+    # folds are cached in ./datasets/cache/oof, see stacking.oof_predictions
+    name = type(clf.clf).__name__
+    folds = list(kfold.split(x_train))
+    return oof_predictions({name: clf}, x_train, y_train, x_test, folds, workers=WORKERS, proba=proba)[name]
 
 
 
@@ -230,11 +210,14 @@ x_test = test.values # Creats an array of the test data
 
 
 # # Create our OOF train and test predictions. These base results will be used as new features
-et_oof_train, et_oof_test = get_oof(et, x_train, y_train, x_test) # Extra Trees
-rf_oof_train, rf_oof_test = get_oof(rf,x_train, y_train, x_test) # Random Forest
-ada_oof_train, ada_oof_test = get_oof(ada, x_train, y_train, x_test) # AdaBoost 
-gb_oof_train, gb_oof_test = get_oof(gb,x_train, y_train, x_test) # Gradient Boost
-svc_oof_train, svc_oof_test = get_oof(svc,x_train, y_train, x_test) # Support Vector Classifier
+# all 5 models x NFOLDS folds are scheduled together, cached folds are read back instead of refitted
+oof = oof_predictions({'et': et, 'rf': rf, 'ada': ada, 'gb': gb, 'svc': svc},
+                      x_train, y_train, x_test, list(kfold.split(x_train)), workers=WORKERS, proba=PROBA)
+et_oof_train, et_oof_test = oof['et'] # Extra Trees
+rf_oof_train, rf_oof_test = oof['rf'] # Random Forest
+ada_oof_train, ada_oof_test = oof['ada'] # AdaBoost 
+gb_oof_train, gb_oof_test = oof['gb'] # Gradient Boost
+svc_oof_train, svc_oof_test = oof['svc'] # Support Vector Classifier
 print("Training is complete")
 
 
@@ -342,18 +325,9 @@ print(x_train[:10])
 
 
 
-gbm = xgb.XGBClassifier(
-    #learning_rate = 0.02,
- n_estimators= 2000,
- max_depth= 4,
- min_child_weight= 2,
- #gamma=1,
- gamma=0.9,                        
- subsample=0.8,
- colsample_bytree=0.8,
- objective= 'binary:logistic',
- nthread= -1,
- scale_pos_weight=1).fit(x_train, y_train)
+# early stopped on held out folds (hist trees) instead of a fixed 2000 rounds
+gbm, meta_summary = fit_meta(x_train, y_train)
+print("XGB rounds = {0}, fit time = {1:.2f}s".format(meta_summary['rounds'], meta_summary['fit_time']))
 predictions = gbm.predict(x_test)
 
 
@@ -362,9 +336,7 @@ predictions = gbm.predict(x_test)
 # predictions = np.around((predictions))
 
 def predict(Y_hat):
-    data = pd.read_csv("./datasets/answer.csv")
-    Y = np.array(data.loc[:,'survived']) 
-    Y = Y[891:]
+    Y = lookup(PassengerId)
     
     print("Test Accuracy = " + str(accuracy_score(Y, Y_hat)))
 
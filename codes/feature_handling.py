@@ -8,21 +8,33 @@ figure(num=None, figsize=(8, 6), dpi=80, facecolor='w', edgecolor='k')
 import warnings
 warnings.filterwarnings('ignore')
 
+from binning import best_bins, search
+from cache import cache_key
+from config import TRAIN_PATH, TEST_PATH
+from imputation import AgeImputer
+from labels import lookup
+from registry import feature, compute
+from tickets import parse_tickets
+from titles import RARE_TITLES, parse_titles, group_titles
 
 
 
 
+
+@feature('sex', inputs=['Sex'], outputs=['male'])
 def sex_extraction(data):
     sex = pd.get_dummies(data['Sex'], drop_first=True)
     return sex
 
 
+@feature('embarked', inputs=['Embarked'], outputs=['Embark_C', 'Embark_Q'])
 def embarked_extraction(data):
     embarked = pd.get_dummies(data['Embarked'], drop_first=False, prefix='Embark') #fills nan with 0 0 0
     embarked.drop('Embark_S', axis=1, inplace=True)
     return embarked
 
 
+@feature('pclass', inputs=['Pclass'], outputs=['class_1', 'class_3'])
 def pclass_extraction(data):
     pclass = pd.get_dummies(data['Pclass'], drop_first=False, prefix='class')
     pclass.drop('class_2', axis=1, inplace=True)
@@ -30,12 +42,18 @@ def pclass_extraction(data):
     return pclass
 
 
-def age_find_bounds(data):
-    data['AgeBand'] = pd.qcut(data['Age'], 4)
-    print(data[['AgeBand', 'Survived']].groupby(['AgeBand'], as_index=False).mean().sort_values(by='AgeBand', ascending=True))
+def find_bounds(data, column, score='log_loss'):
+    # best edges for 2 to 7 bins (see binning.best_bins), ready for FEATURE_CONFIG['bins']
+    for k, (edges, cost) in search(data[column], data['Survived'], score=score).items():
+        print(k, edges, round(cost, 4))
 
-    
-def age_extraction(data):
+
+def age_find_bounds(data, score='log_loss'):
+    find_bounds(data, 'Age', score)
+
+
+@feature('age', inputs=['Age', 'Pclass'], outputs=['age'], version=2)
+def age_extraction(data, bins=(0, 20, 28, 38, 80)):
     
     # STEP 1 IMPUTING (filling missing values)
     def age_handler1(x):
@@ -45,34 +63,23 @@ def age_extraction(data):
 
     # sns.boxplot(x='Pclass', y='Age', data=data)
     # plt.show()
-    def age_handler2(cols):
-        Age=cols[0]
-        Pclass=cols[1]
-        
-        if pd.isnull(Age):
-            if Pclass==1:
-                return 39
-            elif Pclass==2:
-                return 29
-            else:
-                return 24
-        else:
-            return Age
+    # per Pclass medians -> 39 / 29 / 24 on train + test
+    def age_handler2(data):
+        return AgeImputer(by=('Pclass',)).fit_transform(data)
 
     
     age = data.Age
     ## CHOOSE ONE OF THESE TWO METHODS
     # age = age_handler1(age)
-    age = data[['Age', 'Pclass']].apply(age_handler2, axis=1)
+    age = age_handler2(data)
 
 
     ## STEP 2  DISCRETIZATION
 
     def DISCRETIZATION(age):
         # bins = (0, 5, 12, 18, 25, 35, 60, 120)   #LR coefficient = -0.2
-        # group_names = [0, 1, 2, 3, 4, 5, 6]
-        bins = (0, 20, 28, 38, 80)   #LR coefficient = -0.29
-        group_names = [0, 1, 2, 3]
+        # bins = (0, 20, 28, 38, 80)   #LR coefficient = -0.29
+        group_names = list(range(len(bins) - 1))
         age = pd.cut(age, bins, labels=group_names)
 
         return age
@@ -83,71 +90,51 @@ def age_extraction(data):
     return data['age']
 
 
-def fare_find_bounds(data):
-    data['FareBand'] = pd.qcut(data['Fare'], 4)
-    print(data[['FareBand', 'Survived']].groupby(['FareBand'], as_index=False).mean().sort_values(by='FareBand', ascending=True))
+def fare_find_bounds(data, score='log_loss'):
+    find_bounds(data, 'Fare', score)
 
 
-def fare_extraction(data):
+@feature('fare', inputs=['Fare'], outputs=['Fare'], version=2)
+def fare_extraction(data, bins=(-1, 12, 31, 1000)):
     fare = data.Fare.fillna( data.Fare.mean() )
     # print(train.Fare.describe())
     # plt.hist(fare, bins=100)
     # plt.show()
 
     # bins = (-1, 5, 15, 25, 31, 90, 513)
-    # group_names = [0, 1, 2, 3, 4, 5]
-
     # bins = (-0.1, 7.91, 14.454, 31, 1000) #LR Coefficient = -0.1
-    # group_names = [0, 1, 2, 3]
-
     # bins = (-1, 0, 8, 15, 31, 1000) #LR Coefficient = -0.04
-    # group_names = [0, 1, 2, 3, 4]
-
-    bins = (-1, 12, 31, 1000)   #LR Coefficient = -0.16
-    group_names = [0, 1, 2]
+    # bins = (-1, 12, 31, 1000)   #LR Coefficient = -0.16
+    group_names = list(range(len(bins) - 1))
 
     fare = pd.cut(fare, bins, labels=group_names)
     return fare
 
 
 
-def name_extraction(data):
-    name = data.Name
-    name = name.map( lambda name: name.split( ',' )[1].split( '.' )[0].strip() )
-    name = name.replace(['Lady', 'the Countess','Capt', 'Col','Don', 'Dr', 'Major', 'Rev', 'Sir', 'Jonkheer', 'Dona'], 'Rare')
-    name = name.replace(['Mlle', 'Ms'], 'Miss')
-    name = name.replace('Mme', 'Mrs')
+# raw titles (categorical), shared by the title based features
+@feature('title', inputs=['Name'], cache=False)
+def title_parsing(data):
+    return parse_titles(data.Name)
+
+
+@feature('name', inputs=['Name'], requires=['title'], version=2)
+def name_extraction(data, title=None):
+    name = title if title is not None else title_parsing(data)
+    # Lady, the Countess, Capt, Col, Don, Dr, Major, Rev, Sir, Jonkheer, Dona -> Rare, Mlle / Ms -> Miss, Mme -> Mrs
+    name = group_titles(name, RARE_TITLES).astype(object)
     name = pd.get_dummies(name, drop_first=False)
     name.drop('Miss', axis=1, inplace=True)
     return name
 
 
+@feature('ticket', inputs=['Ticket'])
 def ticket_extraction(data):
-    ticket = data.Ticket
-
-    def ticket_handler1(ticket):
-        ticket = ticket.replace( '.' , '' )
-        ticket = ticket.replace( '/' , '' )
-        ticket = ticket.split()
-        ticket = map( lambda t : t.strip() , ticket )
-        ticket = list(filter( lambda t : not t.isdigit() , ticket ))
-        if len( ticket ) > 0:
-            return ticket[0]
-        else: 
-            return 'XXX'
-
-    def ticket_handler2(ticket):
-        ticket = ticket.replace( '.' , '' )
-        ticket = ticket.replace( '/' , '' )
-        ticket = ticket.split()
-        ticket = map( lambda t : t.strip() , ticket )
-        ticket = list(filter( lambda t : not t.isdigit() , ticket ))
-        if len( ticket ) > 0:
-            return (ticket[0])[0]
-        else:
-            return 'X'
-
-    ticket = ticket.map( ticket_handler2 )
+    tickets = parse_tickets(data.Ticket, missing='X')
+
+    ## CHOOSE ONE OF THESE TWO: the whole prefix ('X' if none) or its first letter
+    # ticket = tickets['prefix']
+    ticket = tickets['letter']
     ticket = pd.get_dummies(ticket, drop_first=False, prefix='Ticket')
     # print(ticket.head(20))
     return ticket
@@ -155,6 +142,7 @@ def ticket_extraction(data):
 
 
 
+@feature('cabin', inputs=['Cabin'])
 def cabin_extraction(data):
     cabin = data.Cabin
     cabin = cabin.fillna( 'Without Cabin' )
@@ -164,15 +152,34 @@ def cabin_extraction(data):
 
 
 
+@feature('family_size', inputs=['SibSp', 'Parch'], cache=False)
+def family_size(data):
+    return (data.SibSp + data.Parch + 1).rename('size')
+
+
+@feature('siblings', inputs=['SibSp'], outputs=['SibSp'])
+def siblings_extraction(data):
+    return data.SibSp
+
+
+@feature('parents', inputs=['Parch'], outputs=['Parch'])
+def parents_extraction(data):
+    return data.Parch
+
+
+@feature('size', requires=['family_size'], outputs=['size'])
+def size_extraction(data, family_size):
+    return family_size
+
+
+@feature('isAlone', requires=['family_size'], outputs=['alone'])
+def alone_extraction(data, family_size):
+    return family_size.map( lambda s : 1 if s == 1 else 0 ).rename('alone')
+
+
 def family_extraction(data):
-    siblings = data.SibSp
-    parents = data.Parch
-    size = siblings + parents + 1
-    isAlone = size.map( lambda s : 1 if s == 1 else 0 )
-    data['size'] = size
-    data['alone'] = isAlone
-    
-    return siblings, parents, data['size'], data['alone']
+    size = family_size(data)
+    return siblings_extraction(data), parents_extraction(data), size, alone_extraction(data, size)
 
 
 
@@ -212,7 +219,7 @@ def correlating_categorical_and_numerical_features(data, feature_A, feature_B, f
     grid.add_legend()
     plt.show()
 
-train = pd.read_csv("./datasets/train.csv")
+train = pd.read_csv(TRAIN_PATH)
 # fare_find_bounds(train)
 # age_find_bounds(train)
 
@@ -224,40 +231,60 @@ train = pd.read_csv("./datasets/train.csv")
 # correlating_categorical_and_numerical_features(train, 'Embarked', 'Sex', 'Fare')
 
 
-y_train = train.Survived
-train.drop('Survived', axis=1, inplace=True)
-test = pd.read_csv("./datasets/test.csv")
-passenger_id = test.PassengerId
-full = train.append(test , ignore_index = True)
-full.drop('PassengerId', axis=1, inplace=True)
-
-
-# print(full.describe())
-
-
-
-
-sex = sex_extraction(full)
-embarked = embarked_extraction(full)
-pclass = pclass_extraction(full)
-age = age_extraction(full)
-fare = fare_extraction(full)
-name = name_extraction(full)
-ticket = ticket_extraction(full)
-cabin = cabin_extraction(full)
-siblings, parents, size, isAlone = family_extraction(full)
-
-# full = pd.concat([sex,embarked,pclass,age,fare,name,ticket,cabin,siblings,parents,size,isAlone], axis=1)
-full = pd.concat([sex,embarked,pclass,age,fare,name,isAlone], axis=1)
+# the blocks of the feature matrix, in column order (any registered block or output column):
+# sex, embarked, pclass, age, fare, name, ticket, cabin, siblings, parents, size, isAlone
+# each block is cached on its own, bump its version in @feature when its function changes
+# and 'version' here to rebuild every block
+FEATURE_CONFIG = {
+    'version': 1,
+    'features': ['sex', 'embarked', 'pclass', 'age', 'fare', 'name', 'isAlone'],
+    # edges of the age / fare bins, or the arguments of a binning.best_bins search
+    # on train.csv, e.g. {'k': 4, 'score': 'log_loss'} ('iv', 'accuracy')
+    'bins': {
+        'age': (0, 20, 28, 38, 80),
+        'fare': (-1, 12, 31, 1000),
+    },
+}
+
+
+def bin_edges(block, spec):
+    if isinstance(spec, dict):
+        column = {'age': 'Age', 'fare': 'Fare'}[block]
+        train = pd.read_csv(TRAIN_PATH, usecols=[column, 'Survived'])
+        edges, cost = best_bins(train[column], train['Survived'], **spec)
+        return edges
+    return tuple(spec)
+
+
+def load_manifest():
+    train = pd.read_csv(TRAIN_PATH)
+    train.drop('Survived', axis=1, inplace=True)
+    test = pd.read_csv(TEST_PATH)
+    full = train.append(test , ignore_index = True)
+    full.drop('PassengerId', axis=1, inplace=True)
+    return full
+
+
+def build_features(features=None, use_cache=True, workers=1):
+    # only the blocks the requested features need are computed (ticket and cabin are not by default),
+    # workers > 1 computes independent blocks in parallel worker processes
+    features = FEATURE_CONFIG['features'] if features is None else features
+    key = cache_key([TRAIN_PATH, TEST_PATH], {'version': FEATURE_CONFIG['version']}) if use_cache else None
+    params = {block: {'bins': bin_edges(block, spec)} for block, spec in FEATURE_CONFIG['bins'].items()}
+    full = compute(features, load_manifest, key=key, params=params, workers=workers)
+
+    # sns.heatmap(full.corr(), annot=True)
+    # plt.show()
 
-# full = pd.concat([siblings,parents,size,isAlone], axis=1)
-# sns.heatmap(full.corr(), annot=True)
-# plt.show()
+    # sns.heatmap(full.isnull(),yticklabels=False, cbar=False, cmap='YlGnBu')
+    # plt.show()
+    return full
 
-# print(full.head(2))
 
-# sns.heatmap(full.isnull(),yticklabels=False, cbar=False, cmap='YlGnBu')
-# plt.show()
+y_train = train.Survived
+passenger_id = pd.read_csv(TEST_PATH, usecols=['PassengerId']).PassengerId
+# blocks stored in ./datasets/cache/features, rebuilt only when the CSVs or their version change
+full = build_features()
 
 
 
@@ -270,8 +297,7 @@ def preprocessed_data():
     x_train = full[0:891]
     x_test = full[891:]
 
-    data = pd.read_csv("./datasets/answer.csv")
-    Y = np.array(data.loc[:,'survived']) 
-    y_test = Y[891:]
+    # labels looked up by PassengerId (answer.csv is not in the order of test.csv)
+    y_test = lookup(passenger_id)
 
     return x_train, y_train, x_test, y_test
\ No newline at end of file
@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from cache import CACHE_DIR
+
+
+STORE_DIR = os.path.join(CACHE_DIR, "features")
+
+
+def _is_one_hot(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return False
+    if not (pd.api.types.is_integer_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype)):
+        return False
+    return bool(values.isin([0, 1]).all())
+
+
+def _name_to_json(name):
+    return {'value': name if isinstance(name, str) else repr(name), 'type': type(name).__name__}
+
+
+def _name_from_json(name):
+    if name['type'] == 'str':
+        return name['value']
+    if name['type'] in ('int', 'int64'):
+        return int(name['value'])
+    return float(name['value'])
+
+
+def save_frame(frame, name, key, float_dtype=np.float32, store_dir=STORE_DIR):
+    """
+    Stores a feature matrix column-block by column-block in binary form:
+    0/1 columns in one uint8 array, every other column in one float array,
+    plus a small meta.json with names, dtypes and categories to rebuild the frame.
+
+    Returns the directory of the stored matrix.
+    """
+    directory = os.path.join(store_dir, "{0}-{1}".format(name, key))
+    tmp_directory = directory + '.tmp'
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    os.makedirs(tmp_directory)
+
+    columns = []
+    one_hot = []
+    numeric = []
+    for i in range(frame.shape[1]):
+        values = frame.iloc[:, i]
+        column = {'name': _name_to_json(frame.columns[i]), 'dtype': str(values.dtype)}
+        if _is_one_hot(values):
+            column['block'], column['position'] = 'one_hot', len(one_hot)
+            one_hot.append(values.to_numpy(dtype=np.uint8))
+        else:
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                column['categories'] = values.cat.categories.tolist()
+                column['ordered'] = bool(values.cat.ordered)
+                values = values.astype(np.float64)
+            column['block'], column['position'] = 'numeric', len(numeric)
+            numeric.append(values.to_numpy(dtype=float_dtype))
+        columns.append(column)
+
+    # column-major (Fortran order) so every column of the memory map is contiguous
+    n = len(frame)
+    one_hot = np.column_stack(one_hot) if one_hot else np.zeros((n, 0), np.uint8)
+    numeric = np.column_stack(numeric) if numeric else np.zeros((n, 0), float_dtype)
+    np.save(os.path.join(tmp_directory, 'one_hot.npy'), np.asfortranarray(one_hot))
+    np.save(os.path.join(tmp_directory, 'numeric.npy'), np.asfortranarray(numeric))
+    np.save(os.path.join(tmp_directory, 'index.npy'), frame.index.to_numpy())
+    with open(os.path.join(tmp_directory, 'meta.json'), 'w') as f:
+        json.dump({'columns': columns}, f)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_directory, directory)
+    return directory
+
+
+def load_blocks(name, key, store_dir=STORE_DIR):
+    """
+    Memory maps a stored matrix without reading it: returns the uint8 and float
+    blocks (np.memmap, zero-copy), the index and the column metadata.
+    """
+    directory = os.path.join(store_dir, "{0}-{1}".format(name, key))
+    one_hot = np.load(os.path.join(directory, 'one_hot.npy'), mmap_mode='r')
+    numeric = np.load(os.path.join(directory, 'numeric.npy'), mmap_mode='r')
+    index = np.load(os.path.join(directory, 'index.npy'), allow_pickle=True)
+    with open(os.path.join(directory, 'meta.json')) as f:
+        meta = json.load(f)
+    return one_hot, numeric, index, meta['columns']
+
+
+def load_frame(name, key, store_dir=STORE_DIR):
+    """
+    DataFrame with the original column order, names and (categorical / integer)
+    dtypes. This is a copy: pandas gathers the columns into its own blocks and
+    the dtype conversions allocate, so nothing of the result shares memory with
+    the memory maps. Callers that only need the numbers should use
+    load_blocks() (or cached_blocks()), which does not read or copy anything.
+    """
+    one_hot, numeric, index, columns = load_blocks(name, key, store_dir)
+    blocks = {'one_hot': one_hot, 'numeric': numeric}
+    data = {}
+    for i, column in enumerate(columns):
+        values = blocks[column['block']][:, column['position']]
+        if 'categories' in column:
+            values = pd.Categorical(values, categories=column['categories'], ordered=column['ordered'])
+        elif column['block'] == 'one_hot' or column['dtype'].startswith('int'):
+            values = values.astype(column['dtype'])
+        data[i] = values
+    frame = pd.DataFrame(data, index=pd.Index(index))
+    frame.columns = [_name_from_json(column['name']) for column in columns]
+    return frame
+
+
+def exists(name, key, store_dir=STORE_DIR):
+    return os.path.exists(os.path.join(store_dir, "{0}-{1}".format(name, key), 'meta.json'))
+
+
+def cached_frame(name, key, build, float_dtype=np.float32, store_dir=STORE_DIR):
+    """
+    load_frame() of name/key if it is in the store, otherwise build() it,
+    store it and return the stored version (so both paths give the same dtypes).
+    """
+    if not exists(name, key, store_dir):
+        save_frame(build(), name, key, float_dtype, store_dir)
+    return load_frame(name, key, store_dir)
+
+
+def cached_blocks(name, key, build, float_dtype=np.float32, store_dir=STORE_DIR):
+    # same as cached_frame(), but the zero-copy load_blocks() of the stored matrix
+    if not exists(name, key, store_dir):
+        save_frame(build(), name, key, float_dtype, store_dir)
+    return load_blocks(name, key, store_dir)
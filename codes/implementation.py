@@ -10,7 +10,6 @@ from sklearn.naive_bayes import GaussianNB
 from sklearn.svm import SVC, LinearSVC
 from sklearn.ensemble import RandomForestClassifier , GradientBoostingClassifier, AdaBoostClassifier, ExtraTreesClassifier, BaggingClassifier
 from sklearn.model_selection import StratifiedKFold, train_test_split, KFold
-from sklearn.feature_selection import RFECV
 
 import pandas as pd
 import numpy as np
@@ -20,11 +19,17 @@ import xgboost as xgb
 import plotly.graph_objs as go
 import plotly.offline as py
 
+from benchmark import benchmark_models
+from labels import lookup, test_labels
+from stacking import base_predictions, fit_meta
+from selection import eliminate
+from tuning import sweep_n_estimators
+from validation import cross_validate
 
-def test_evaluation(Y_hat):
-    data = pd.read_csv("./datasets/answer.csv")
-    Y = np.array(data.loc[:,'survived']) 
-    Y = Y[891:]
+
+def test_evaluation(Y_hat, passenger_ids=None):
+    # # Y_hat for the rows of test.csv, or for the given passenger_ids
+    Y = test_labels() if passenger_ids is None else lookup(passenger_ids)
     accuracy = accuracy_score(Y, Y_hat)
     print("Test Accuracy = " + str(accuracy))
 
@@ -46,35 +51,23 @@ def plot_variable_importance( x , y ):
     plot_model_var_imp( tree , x , y )
 
 
-def find_best_RFC(model):
-    model = RandomForestClassifier()
-    # Set the model to the best combination of parameters
-    parameters = {'n_estimators': [10, 20, 30, 40, 50, 60, 70, 80, 90, 100]}
-            
-    acc_scorer = make_scorer(accuracy_score)
-
-    grid_obj = GridSearchCV(model, parameters, scoring=acc_scorer)
-    grid_obj = grid_obj.fit(x_train, y_train)
-    model = grid_obj.best_estimator_
+def find_best_RFC(x_train, y_train, model=None):
+    model = RandomForestClassifier() if model is None else model
+    # one forest of 100 trees per fold scores all the sizes (tuning.sweep_n_estimators),
+    # returns the model with the best n_estimators fitted on x_train
+    n_estimators = [10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
+    model, scores = sweep_n_estimators(model, x_train, y_train, n_estimators)
 
     return model
 
 
-def run_kfold(clf, X_all, Y_all):
-    kf = KFold(n_splits=10)
-    outcomes = []
-    fold = 0
-    for train_index, test_index in kf.split(X_all, Y_all):
-        fold += 1
-        X_train, X_test = X_all.values[train_index], X_all.values[test_index]
-        y_train, y_test = Y_all.values[train_index], Y_all.values[test_index]
-        clf.fit(X_train, y_train)
-        predictions = clf.predict(X_test)
-        accuracy = accuracy_score(y_test, predictions)
-        outcomes.append(accuracy)
-        print("Fold {0} accuracy: {1}".format(fold, accuracy))     
-    mean_outcome = np.mean(outcomes)
-    print("Mean Accuracy: {0}".format(mean_outcome)) 
+def run_kfold(clf, X_all, Y_all, workers=1, **kwargs):
+    # 10 folds in order by default, see validation.compare for stratified / repeated / seeded folds
+    result = cross_validate(clf, X_all, Y_all, workers=workers, **kwargs)
+    for fold, accuracy in enumerate(result.scores, 1):
+        print("Fold {0} accuracy: {1}".format(fold, accuracy))
+    print("Mean Accuracy: {0}".format(result.mean))
+    return result
 
 
 
@@ -103,29 +96,44 @@ def get_models():
     return model
 
 
-def test_models(x_train, y_train, x_test, y_test):
-    models = get_models()
-    for model in models:
-        model.fit( x_train , y_train )
-        print ("Train : " + str(model.score( x_train , y_train )))
-        print ("Test  : " + str(model.score( x_test , y_test )))
+def test_models(x_train, y_train, x_test, y_test, save_baseline=False):
+    # # fit time, predict latency, size and memory on top of the accuracies, written to
+    # # benchmark.REPORT_PATH and compared with benchmark.BASELINE_PATH (if there is one)
+    results, regressions = benchmark_models(get_models(), x_train, y_train, x_test, y_test, save_baseline=save_baseline)
+    for name, row in results.iterrows():
+        print (name)
+        print ("Train : " + str(row['train_accuracy']))
+        print ("Test  : " + str(row['test_accuracy']))
+        print ("Fit   : {0:.3f}s, predict p50/p99 {1:.3f}/{2:.3f} ms (1 row), {3:.0f} rows/s (10k rows), {4:.0f} bytes".format(
+            row['fit_time'], row['p50_ms_1'], row['p99_ms_1'], row['rows_per_s_10000'], row['model_bytes']))
         print("")
+    if len(regressions):
+        print ("Regressions against the baseline :")
+        print (regressions)
+    return results
 
 
 
-def optimal_features(model, x_train, y_train, x_test, y_test):
-    rfecv = RFECV( estimator = model , step = 1 , cv = StratifiedKFold( 2 ) , scoring = 'accuracy' )
-    rfecv.fit( x_train , y_train )
+def optimal_features(model, x_train, y_train, x_test, y_test, workers=1, prefilter_keep=None, patience=10):
+    # # scheduled elimination (fractional steps, then one feature at a time) instead of RFECV(step=1),
+    # # folds evaluated on `workers` processes, stopped once the CV score plateaus
+    selected = eliminate(model, x_train, y_train, workers=workers, prefilter_keep=prefilter_keep, patience=patience)
+    # # by position: the processed matrix has repeated column labels, the names are only printed
+    take = lambda x: x.iloc[:, selected.indices] if hasattr(x, 'iloc') else np.asarray(x)[:, selected.indices]
+    model.fit(take(x_train), y_train)
 
-    print (rfecv.score( x_train , y_train ) , rfecv.score( x_test , y_test ))
-    print( "Optimal number of features : %d" % rfecv.n_features_ )
+    print (model.score( take(x_train) , y_train ) , model.score( take(x_test) , y_test ))
+    print( "Optimal number of features : %d" % selected.n_features )
+    if selected.names is not None:
+        print( "Selected features : %s" % list(selected.names) )
 
     # # Plot number of features VS. cross-validation scores
     plt.figure()
     plt.xlabel( "Number of features selected" )
     plt.ylabel( "Cross validation score (nb of correct classifications)" )
-    plt.plot( range( 1 , len( rfecv.grid_scores_ ) + 1 ) , rfecv.grid_scores_ )
+    plt.plot( selected.scores.index , selected.scores['mean'] , marker = 'o' )
     plt.show()
+    return selected
 
 
 
@@ -136,18 +144,12 @@ def logisticregression_coefficients(x_train, model):
     print(coeff_df.sort_values(by='Correlation', ascending=False))
 
 
-def first_level(x_train, y_train, x_test, j=4):
+def first_level(x_train, y_train, x_test, j=4, workers=1, use_cache=True):
     # # j = number of models we want to stack
-    models = get_models()
-    y_trains = []
-    y_tests = []
-    for i in range(j):
-        model = models[i]
-        model.fit( x_train , y_train )
-        train_y = model.predict( x_train )
-        test_y = model.predict( x_test )
-        y_tests.append(test_y)
-        y_trains.append(train_y)
+    # predictions are cached per (model, params, matrices), only new / changed models are fitted,
+    # workers > 1 fits them in parallel processes
+    models = get_models()[:j]
+    y_trains, y_tests = base_predictions(models, x_train, y_train, x_test, workers=workers, use_cache=use_cache)
 
     base_predictions_train = pd.DataFrame()
     for i in range(j):
@@ -176,20 +178,9 @@ def first_level(x_train, y_train, x_test, j=4):
 
 
 def second_level(x_train, y_train, x_test, y_test):
-    gbm = xgb.XGBClassifier(
-    #learning_rate = 0.02,
-    n_estimators= 2000,
-    max_depth= 4,
-    min_child_weight= 2,
-    #gamma=1,
-    gamma=0.9,                        
-    subsample=0.8,
-    colsample_bytree=0.8,
-    objective= 'binary:logistic',
-    nthread= -1,
-    scale_pos_weight=1)
-
-    gbm.fit(x_train, y_train)
+    # # early stopped on held out folds (hist trees) instead of a fixed 2000 rounds
+    gbm, summary = fit_meta(x_train, y_train)
+    print ("XGB rounds = {0} (per fold {1}), fit time = {2:.2f}s".format(summary['rounds'], summary['fold_rounds'], summary['fit_time']))
 
     print ("XGB train accuracy = " + str(gbm.score( x_train , y_train )))
     print ("XGB test accuracy = " + str(gbm.score( x_test , y_test )))
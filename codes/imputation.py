@@ -0,0 +1,114 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+
+class AgeImputer(object):
+    """
+    Fills missing ages with medians learnt per group of passengers.
+
+    The groups are given by the `by` columns, e.g. ('Pclass',) which gives the
+    39 / 29 / 24 medians of the full Kaggle manifest, or ('Pclass', 'Sex', 'Title').
+    A passenger whose group was not seen at fit time falls back to the coarser
+    groups (('Pclass', 'Sex'), then ('Pclass',)) and finally to the overall median.
+
+    fit() learns the medians once (on the training manifest), transform() only
+    looks them up, so the same statistics are reused when scoring new data.
+    """
+
+    def __init__(self, by=('Pclass',), column='Age'):
+        self.by = tuple(by)
+        self.column = column
+
+    def fit(self, data):
+        ages = data[self.column]
+        self.medians_ = []
+        for depth in range(len(self.by), 0, -1):
+            keys = list(self.by[:depth])
+            self.medians_.append((keys, ages.groupby([data[k] for k in keys]).median()))
+        self.median_ = ages.median()
+        # plain dicts for the single passenger path (impute_one)
+        self.tables_ = [(keys, medians.to_dict()) for keys, medians in self.medians_]
+        return self
+
+    def impute_one(self, record):
+        # record: dict-like passenger, returns its (possibly imputed) age
+        age = record.get(self.column)
+        if age is not None and age == age:
+            return age
+        for keys, table in self.tables_:
+            key = record[keys[0]] if len(keys) == 1 else tuple(record[k] for k in keys)
+            value = table.get(key)
+            if value is not None and value == value:
+                return value
+        return self.median_
+
+    def _lookup(self, data, keys, medians):
+        if len(keys) == 1:
+            return data[keys[0]].map(medians).to_numpy(dtype=np.float64)
+        index = pd.MultiIndex.from_arrays([data[k] for k in keys])
+        return medians.reindex(index).to_numpy(dtype=np.float64)
+
+    def transform(self, data):
+        age = data[self.column].to_numpy(dtype=np.float64)
+        missing = np.isnan(age)
+        fill = np.full(len(age), np.nan)
+        if missing.any():
+            rows = data[missing]
+            fill_missing = np.full(len(rows), np.nan)
+            for keys, medians in self.medians_:
+                fill_missing = np.where(np.isnan(fill_missing), self._lookup(rows, keys, medians), fill_missing)
+            fill[missing] = np.where(np.isnan(fill_missing), self.median_, fill_missing)
+        return pd.Series(np.where(missing, fill, age), index=data.index, name=self.column)
+
+    def fit_transform(self, data):
+        return self.fit(data).transform(data)
+
+
+def synthetic_manifest(n, seed=0):
+    rng = np.random.RandomState(seed)
+    data = pd.DataFrame()
+    data['Pclass'] = rng.randint(1, 4, n)
+    # class-dependent ages centred on the Kaggle medians 39 / 29 / 24
+    centre = np.array([0, 39, 29, 24])[data['Pclass']]
+    data['Age'] = np.clip(centre + rng.normal(0, 12, n), 1, 80).round()
+    data.loc[rng.rand(n) < 0.2, 'Age'] = np.nan  # ~ the Kaggle missing rate
+    return data
+
+
+def benchmark(n=10 ** 6):
+    data = synthetic_manifest(n)
+
+    def age_handler(cols):
+        Age=cols[0]
+        Pclass=cols[1]
+
+        if pd.isnull(Age):
+            if Pclass==1:
+                return 39
+            elif Pclass==2:
+                return 29
+            else:
+                return 24
+        else:
+            return Age
+
+    start = time.time()
+    slow = data[['Age', 'Pclass']].apply(age_handler, axis=1)
+    row_wise = time.time() - start
+
+    start = time.time()
+    imputer = AgeImputer().fit(data)
+    fast = imputer.transform(data)
+    vectorized = time.time() - start
+
+    print("rows = {0}".format(n))
+    print("apply(axis=1)  : {0:.3f}s".format(row_wise))
+    print("AgeImputer     : {0:.3f}s  ({1:.0f}x faster)".format(vectorized, row_wise / vectorized))
+    print("filled medians : {0}".format(imputer.medians_[-1][1].to_dict()))
+    print("max abs diff to apply(axis=1) = {0}".format(np.abs(slow - fast).max()))
+
+
+if __name__ == '__main__':
+    benchmark()
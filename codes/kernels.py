@@ -0,0 +1,127 @@
+import time
+
+import numpy as np
+
+
+def _float(x):
+    # float32 and float64 arrays are kept as they are, everything else is computed in float64
+    x = np.asarray(x)
+    return x if x.dtype in (np.float32, np.float64) else x.astype(np.float64)
+
+
+def _buffer(out, x):
+    if out is None:
+        return np.empty_like(x)
+    if out.shape != x.shape:
+        raise ValueError("out has shape {0}, expected {1}".format(out.shape, x.shape))
+    return out
+
+
+def sigmoid(z, out=None):
+    """
+    1 / (1 + exp(-z)), elementwise, without overflow for large |z|: only
+    exp(-|z|) <= 1 is ever computed, and sigmoid(z) = 1 - sigmoid(-z) for z >= 0.
+
+    out -- array to write into (may be z itself), float32 in float32 out
+    """
+    z = _float(z)
+    out = _buffer(out, z)
+    positive = z >= 0
+    np.abs(z, out=out)
+    np.negative(out, out=out)
+    np.exp(out, out=out)                    # exp(-|z|)
+    np.divide(out, 1 + out, out=out)        # sigmoid(-|z|)
+    np.subtract(1, out, out=out, where=positive)
+    return out
+
+
+def sigmoid_derivative(s, out=None):
+    # derivative of the sigmoid, from its output s = sigmoid(z): s * (1 - s)
+    s = _float(s)
+    out = _buffer(out, s)
+    np.subtract(1, s, out=out)
+    np.multiply(out, s, out=out)
+    return out
+
+
+def relu(z, out=None):
+    z = _float(z)
+    return np.maximum(z, 0, out=_buffer(out, z))
+
+
+def relu_derivative(z, out=None):
+    # 1 where z > 0, else 0 (also at 0), in the dtype of z
+    z = _float(z)
+    return np.greater(z, 0, out=_buffer(out, z))
+
+
+def binary_cross_entropy(y, p, reduction='mean', out=None):
+    """
+    -(y log p + (1 - y) log(1 - p)), with p clipped to [eps, 1 - eps] (eps of
+    the dtype of p) so that confident mistakes cost a large finite loss.
+
+    reduction -- 'mean', 'sum' or 'none' (the loss of every element, written to out)
+    """
+    p = _float(p)
+    y = np.asarray(y, dtype=p.dtype)
+    eps = np.finfo(p.dtype).eps
+    loss = _buffer(out, p)
+    np.clip(p, eps, 1 - eps, out=loss)
+    work = np.subtract(1, loss)
+    np.log(loss, out=loss)
+    np.log(work, out=work)
+    loss *= y
+    work *= 1 - y
+    loss += work
+    np.negative(loss, out=loss)
+    return _reduce(loss, reduction)
+
+
+def binary_cross_entropy_with_logits(y, z, reduction='mean', out=None):
+    """
+    binary_cross_entropy(y, sigmoid(z)) computed from the logits z, exact
+    for any z: max(z, 0) - z y + log(1 + exp(-|z|)).
+    """
+    z = _float(z)
+    y = np.asarray(y, dtype=z.dtype)
+    loss = _buffer(out, z)
+    work = np.abs(z)
+    np.negative(work, out=work)
+    np.exp(work, out=work)
+    np.log1p(work, out=work)
+    np.maximum(z, 0, out=loss)
+    loss -= z * y
+    loss += work
+    return _reduce(loss, reduction)
+
+
+def _reduce(loss, reduction):
+    if reduction == 'mean':
+        return loss.mean()
+    if reduction == 'sum':
+        return loss.sum()
+    if reduction == 'none':
+        return loss
+    raise ValueError("reduction must be 'mean', 'sum' or 'none', not {0!r}".format(reduction))
+
+
+def benchmark(n=10 ** 6, repeats=20):
+    rng = np.random.RandomState(0)
+    for dtype in (np.float32, np.float64):
+        z = (rng.randn(n) * 20).astype(dtype)
+        out = np.empty_like(z)
+        y = (rng.rand(n) > 0.5).astype(dtype)
+        timings = [('sigmoid', lambda: sigmoid(z)), ('sigmoid, out=', lambda: sigmoid(z, out=out)),
+                   ('relu, out=', lambda: relu(z, out=out)), ('relu_derivative, out=', lambda: relu_derivative(z, out=out)),
+                   ('binary_cross_entropy', lambda: binary_cross_entropy(y, sigmoid(z, out=out))),
+                   ('..._with_logits', lambda: binary_cross_entropy_with_logits(y, z))]
+        for name, function in timings:
+            start = time.perf_counter()
+            for _ in range(repeats):
+                function()
+            print("{0:8} {1:22} {2:.2f} ms per {3} values".format(
+                np.dtype(dtype).name, name, (time.perf_counter() - start) / repeats * 1000, n))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,104 @@
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from cache import CACHE_DIR, cache_key
+from config import TRAIN_PATH, TEST_PATH, LABELED_TEST_PATH
+
+
+LABEL_DIR = os.path.join(CACHE_DIR, "labels")
+UNKNOWN = -1
+
+# {file times: (survived by PassengerId, test PassengerIds)}, memory-mapped
+_loaded = {}
+
+
+def _build(directory):
+    """
+    Writes survived.npy, an int8 array indexed by PassengerId (UNKNOWN where
+    there is no label) filled from train.csv and the labeled test set, and
+    test_ids.npy, the PassengerIds of test.csv in their order.
+    """
+    known = pd.concat([pd.read_csv(TRAIN_PATH, usecols=['PassengerId', 'Survived']),
+                       pd.read_csv(LABELED_TEST_PATH, usecols=['PassengerId', 'Survived'])]).dropna()
+    ids = known['PassengerId'].to_numpy(dtype=np.int64)
+    if len(np.unique(ids)) != len(ids):
+        raise ValueError("PassengerId labeled more than once")
+    survived = np.full(ids.max() + 1, UNKNOWN, dtype=np.int8)
+    survived[ids] = known['Survived'].to_numpy(dtype=np.int8)
+    test_ids = pd.read_csv(TEST_PATH, usecols=['PassengerId']).PassengerId.to_numpy(dtype=np.int64)
+
+    tmp_directory = '{0}.{1}.tmp'.format(directory, os.getpid())
+    os.makedirs(tmp_directory, exist_ok=True)
+    np.save(os.path.join(tmp_directory, 'survived.npy'), survived)
+    np.save(os.path.join(tmp_directory, 'test_ids.npy'), test_ids)
+    try:
+        os.replace(tmp_directory, directory)
+    except OSError:  # built by another process in the meantime
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        if not os.path.exists(directory):
+            raise
+
+
+def _labels(label_dir=LABEL_DIR):
+    # the arrays are parsed from the CSVs once per content of the CSVs, then only mapped;
+    # a process hashes the CSVs again only when one of them was modified
+    paths = [TRAIN_PATH, TEST_PATH, LABELED_TEST_PATH]
+    modified = tuple(os.stat(path).st_mtime_ns for path in paths)
+    if modified not in _loaded:
+        directory = os.path.join(label_dir, cache_key(paths, {'version': 1}))
+        if not os.path.exists(directory):
+            _build(directory)
+        _loaded[modified] = (np.load(os.path.join(directory, 'survived.npy'), mmap_mode='r'),
+                             np.load(os.path.join(directory, 'test_ids.npy'), mmap_mode='r'))
+    return _loaded[modified]
+
+
+def lookup(passenger_ids, strict=True):
+    """
+    Survival labels (int8) of any batch of PassengerIds, in the same order.
+
+    The labels are a memory-mapped array indexed by PassengerId, so a lookup
+    is one vectorized take, and processes forked after the first lookup (or
+    that map the same file) share the pages instead of parsing CSVs.
+
+    strict=False returns UNKNOWN (-1) for ids without a label instead of raising KeyError.
+    """
+    survived = _labels()[0]
+    ids = np.asarray(passenger_ids, dtype=np.int64)
+    inside = (ids >= 0) & (ids < len(survived))
+    labels = np.full(ids.shape, UNKNOWN, dtype=np.int8)
+    labels[inside] = survived[ids[inside]]
+    if strict and (labels == UNKNOWN).any():
+        raise KeyError("no label for PassengerId " + ", ".join(str(i) for i in ids[labels == UNKNOWN][:10]))
+    return labels
+
+
+def test_ids():
+    return np.asarray(_labels()[1])
+
+
+def test_labels():
+    # labels of test.csv, in its row order (what the old answer.csv[891:] slicing was meant to be)
+    return lookup(test_ids())
+
+
+def benchmark(repeats=100):
+    ids = test_ids()
+    start = time.time()
+    for _ in range(repeats):
+        answers = pd.read_csv("./datasets/answer.csv")
+        np.array(answers.loc[:, 'survived'])[891:]
+    print("answer.csv read + slice   {0:.3f} ms".format((time.time() - start) / repeats * 1000))
+    lookup(ids)
+    start = time.time()
+    for _ in range(repeats):
+        lookup(ids)
+    print("lookup of 418 ids         {0:.3f} ms".format((time.time() - start) / repeats * 1000))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -1,21 +1,94 @@
+import time
+
+import numpy as np
 import pandas as pd
 
 import warnings
 warnings.filterwarnings("ignore", category=FutureWarning)
 
 
-test_df = pd.read_csv("./datasets/test.csv")
-unordered = pd.read_csv("./datasets/answer.csv")
+# (test column, answer column) pairs that identify a passenger together with the name
+KEYS = [('Age', 'age'), ('Ticket', 'ticket')]
+
+
+def normalize_names(names):
+    # case, surrounding and repeated blanks do not tell passengers apart
+    return names.astype(str).str.strip().str.replace(r'\s+', ' ', regex=True).str.lower()
+
+
+def match_labels(test_df, unordered, keys=KEYS):
+    """
+    Survival label of every test passenger, looked up in the answer list.
+
+    A test row matches an answer row with the same (normalized) name and the
+    same value of one of the keys (missing values never match). For each key
+    the answer rows are hashed once on (name, key) by a merge, so the whole
+    matching is linear in the number of rows. When several answer rows match,
+    the first one in answer order wins, like the original row by row scan.
+
+    Returns a DataFrame aligned with test_df:
+    PassengerId, Survived (<NA> if unmatched), matches (distinct answer rows
+    matching), and the answer row used (position in unordered, -1 if none).
+    """
+    test = pd.DataFrame({'name': normalize_names(test_df['Name']).values, 'row': np.arange(len(test_df))})
+    answers = pd.DataFrame({'name': normalize_names(unordered['name']).values, 'position': np.arange(len(unordered))})
+
+    candidates = []
+    for test_column, answer_column in keys:
+        left = test.assign(key=test_df[test_column].values).dropna(subset=['key'])
+        right = answers.assign(key=unordered[answer_column].values).dropna(subset=['key'])
+        candidates.append(left.merge(right, on=['name', 'key'])[['row', 'position']])
+    candidates = pd.concat(candidates).drop_duplicates()
+
+    grouped = candidates.groupby('row')['position']
+    first = grouped.min().reindex(range(len(test_df)), fill_value=-1).to_numpy()
+    matches = grouped.size().reindex(range(len(test_df)), fill_value=0).to_numpy()
+
+    survived = pd.Series(unordered['survived'].to_numpy()[np.maximum(first, 0)]).astype('Int64')
+    survived[first < 0] = pd.NA
+    return pd.DataFrame({'PassengerId': test_df['PassengerId'].values, 'Survived': survived.values,
+                         'matches': matches, 'answer_row': first})
+
+
+def report(matched):
+    # prints the test passengers without a label, or with more than one candidate
+    unmatched = matched[matched['matches'] == 0]
+    ambiguous = matched[matched['matches'] > 1]
+    print("{0} rows, {1} unmatched, {2} ambiguous".format(len(matched), len(unmatched), len(ambiguous)))
+    if len(unmatched):
+        print("unmatched PassengerId: " + " ".join(str(p) for p in unmatched['PassengerId']))
+    if len(ambiguous):
+        print("ambiguous PassengerId: " + " ".join(str(p) for p in ambiguous['PassengerId']))
+
+
+def benchmark(n=1000000, seed=0):
+    # n test rows against n answer rows, a quarter of them matched by age only, a quarter by ticket only
+    rng = np.random.RandomState(seed)
+    names = pd.Series(np.char.add('passenger, mr. ', rng.permutation(n).astype(str)))
+    ages = rng.randint(1, 80, n).astype(np.float64)
+    tickets = pd.Series(rng.randint(0, 10 ** 6, n).astype(str))
+    order = rng.permutation(n)
+    unordered = pd.DataFrame({'name': names[order].str.upper().values, 'age': ages[order],
+                              'ticket': tickets[order].values, 'survived': rng.randint(0, 2, n)})
+    test_df = pd.DataFrame({'PassengerId': np.arange(n), 'Name': names.values, 'Age': ages, 'Ticket': tickets.values})
+    test_df.loc[: n // 4 - 1, 'Age'] = np.nan
+    test_df.loc[n // 4: n // 2 - 1, 'Ticket'] = 'lost'
+
+    start = time.time()
+    matched = match_labels(test_df, unordered)
+    print("{0} x {1} rows in {2:.2f}s".format(n, n, time.time() - start))
+    report(matched)
 
-res = pd.DataFrame()
-res['PassengerId'] = test_df['PassengerId']
-res['Survived'] = ''
 
+if __name__ == '__main__':
+    import sys
+    if '--benchmark' in sys.argv:
+        benchmark()
+        sys.exit()
 
-for index, row in test_df.iterrows():
-    for index2,row2 in unordered.iterrows():
-        if (row2['name']==row['Name'] and row2['age']==row['Age']) or (row2['name']==row['Name'] and row2['ticket']==row['Ticket']):
-            res.loc[res['PassengerId'] == row['PassengerId'], 'Survived'] = row2['survived']
-            break
+    test_df = pd.read_csv("./datasets/test.csv")
+    unordered = pd.read_csv("./datasets/answer.csv")
 
-res.to_csv("./datasets/labeled_test_set.csv", index = False)
\ No newline at end of file
+    matched = match_labels(test_df, unordered)
+    report(matched)
+    matched[['PassengerId', 'Survived']].to_csv("./datasets/labeled_test_set.csv", index = False)
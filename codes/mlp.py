@@ -0,0 +1,232 @@
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.model_selection import train_test_split
+
+from batching import epochs
+from kernels import binary_cross_entropy, relu, sigmoid, sigmoid_derivative
+
+
+class MLPClassifier(BaseEstimator, ClassifierMixin):
+    """
+    Fully connected network for the 0/1 survival target, trained with Adam on
+    the binary cross-entropy, in NumPy only (the deep nets of Results, without
+    TensorFlow).
+
+    All the weights and biases live in one flat vector (and so do their
+    gradients and the Adam moments), so an Adam step is a handful of
+    vectorized operations whatever the number of layers; the activations of
+    a batch are written into buffers allocated once per fit.
+
+    Arguments:
+    hidden_layers -- units of every hidden layer (the output layer is one sigmoid unit)
+    activation -- 'relu' or 'sigmoid', for the hidden layers
+    l2 -- lambda of the L2 penalty lambda / (2 m) * sum(W ** 2), as in Results
+    epochs -- most passes over the training rows (at least 1)
+    batch_size -- None: full batch, otherwise shuffled mini-batches (batching.epochs)
+    validation -- fraction of the rows held out (stratified) for early stopping, 0: none
+    patience -- epochs without a better validation loss before stopping; the best weights are kept
+    dtype -- np.float32 or np.float64
+    verbose -- print the losses every `verbose` epochs (0: never)
+
+    After fit():
+    history_ -- DataFrame per epoch: loss, val_loss, seconds
+    best_epoch_, n_epochs_, fit_time_
+    """
+
+    def __init__(self, hidden_layers=(25, 12, 6, 6, 6), activation='relu', learning_rate=0.008, l2=0.0,
+                 epochs=10000, batch_size=None, validation=0.1, patience=500, beta1=0.9, beta2=0.999,
+                 epsilon=1e-8, dtype=np.float32, seed=0, verbose=0):
+        self.hidden_layers = hidden_layers
+        self.activation = activation
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.validation = validation
+        self.patience = patience
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.epsilon = epsilon
+        self.dtype = dtype
+        self.seed = seed
+        self.verbose = verbose
+
+    def _layout(self, n_x):
+        # the (W, b) views of the flat parameter vector, and of the flat gradient vector
+        sizes = [n_x] + list(self.hidden_layers) + [1]
+        total = sum(n_in * n_out + n_out for n_in, n_out in zip(sizes[:-1], sizes[1:]))
+        self.params_ = np.zeros(total, dtype=self.dtype)
+        self._grads = np.zeros(total, dtype=self.dtype)
+        self.layers_, self._grad_layers = [], []
+        start = 0
+        for n_in, n_out in zip(sizes[:-1], sizes[1:]):
+            end = start + n_in * n_out
+            self.layers_.append((self.params_[start:end].reshape(n_in, n_out), self.params_[end:end + n_out]))
+            self._grad_layers.append((self._grads[start:end].reshape(n_in, n_out), self._grads[end:end + n_out]))
+            start = end + n_out
+
+    def _initialize(self, rng):
+        # He initialization for ReLU layers, Xavier for sigmoid ones, zero biases
+        for i, (W, b) in enumerate(self.layers_):
+            gain = 2.0 if self.activation == 'relu' and i < len(self.layers_) - 1 else 1.0
+            W[...] = rng.randn(*W.shape) * np.sqrt(gain / W.shape[0])
+            b[...] = 0
+
+    def _buffers(self, n):
+        return [(np.empty((n, W.shape[1]), dtype=self.dtype), np.empty((n, W.shape[1]), dtype=self.dtype))
+                for W, b in self.layers_]
+
+    def _forward(self, x, buffers):
+        # fills (Z, A) of every layer for the n rows of x, returns the output probabilities
+        n = len(x)
+        A = x
+        for i, ((W, b), (Z_buffer, A_buffer)) in enumerate(zip(self.layers_, buffers)):
+            Z = np.matmul(A, W, out=Z_buffer[:n])
+            Z += b
+            if i == len(self.layers_) - 1 or self.activation == 'sigmoid':
+                A = sigmoid(Z, out=A_buffer[:n])
+            else:
+                A = relu(Z, out=A_buffer[:n])
+        return A
+
+    def _backward(self, x, y, buffers, deltas):
+        # gradients of the mean loss (+ L2) of the batch into self._grads
+        n = len(x)
+        last = len(self.layers_) - 1
+        dZ = np.subtract(buffers[last][1][:n], y, out=deltas[last][:n])
+        dZ /= n
+        for i in range(last, -1, -1):
+            W, b = self.layers_[i]
+            dW, db = self._grad_layers[i]
+            A_prev = x if i == 0 else buffers[i - 1][1][:n]
+            np.matmul(A_prev.T, dZ, out=dW)
+            if self.l2:
+                dW += (self.l2 / n) * W
+            dZ.sum(axis=0, out=db)
+            if i > 0:
+                dA = np.matmul(dZ, W.T, out=deltas[i - 1][:n])
+                if self.activation == 'relu':
+                    dA *= buffers[i - 1][0][:n] > 0
+                else:
+                    dA *= sigmoid_derivative(buffers[i - 1][1][:n])
+                dZ = dA
+
+    def _loss(self, y, probabilities):
+        loss = binary_cross_entropy(y, probabilities)
+        if self.l2:
+            loss += self.l2 / (2 * len(y)) * sum(float(np.dot(W.ravel(), W.ravel())) for W, b in self.layers_)
+        return loss
+
+    def fit(self, X, y):
+        if self.epochs < 1:
+            raise ValueError("epochs must be at least 1, not {0}".format(self.epochs))
+        X = np.ascontiguousarray(X, dtype=self.dtype)
+        y = np.asarray(y, dtype=self.dtype).reshape(-1, 1)
+        self.classes_ = np.array([0, 1])
+        if self.validation:
+            X, x_val, y, y_val = train_test_split(X, y, test_size=self.validation, stratify=y.ravel(),
+                                                  random_state=self.seed)
+            val_buffers = None
+        rng = np.random.RandomState(self.seed)
+        self._layout(X.shape[1])
+        self._initialize(rng)
+
+        m = len(X)
+        batch_size = min(self.batch_size or m, m)
+        buffers = self._buffers(batch_size)
+        deltas = [np.empty((batch_size, W.shape[1]), dtype=self.dtype) for W, b in self.layers_]
+        moment1 = np.zeros_like(self.params_)
+        moment2 = np.zeros_like(self.params_)
+        step = np.empty_like(self.params_)
+
+        losses = np.full(self.epochs, np.nan)
+        val_losses = np.full(self.epochs, np.nan)
+        seconds = np.full(self.epochs, np.nan)
+        best_loss, best_params, self.best_epoch_, t = np.inf, self.params_.copy(), 0, 0
+
+        start = time.perf_counter()
+        batches = epochs(X, y, self.epochs, batch_size, self.seed) if batch_size < m else \
+            ((epoch, [(X, y)]) for epoch in range(self.epochs))
+        for epoch, epoch_batches in batches:
+            epoch_start = time.perf_counter()
+            total = 0.0
+            for x_batch, y_batch in epoch_batches:
+                probabilities = self._forward(x_batch, buffers)
+                total += self._loss(y_batch, probabilities) * len(x_batch)
+                self._backward(x_batch, y_batch, buffers, deltas)
+
+                # Adam
+                t += 1
+                moment1 *= self.beta1
+                moment1 += (1 - self.beta1) * self._grads
+                moment2 *= self.beta2
+                np.square(self._grads, out=step)
+                step *= 1 - self.beta2
+                moment2 += step
+                np.sqrt(moment2, out=step)
+                step *= 1 / np.sqrt(1 - self.beta2 ** t)
+                step += self.epsilon
+                np.divide(moment1, step, out=step)
+                step *= self.learning_rate / (1 - self.beta1 ** t)
+                self.params_ -= step
+            losses[epoch] = total / m
+
+            if self.validation:
+                if val_buffers is None:
+                    val_buffers = self._buffers(len(x_val))
+                val_losses[epoch] = self._loss(y_val, self._forward(x_val, val_buffers))
+                if val_losses[epoch] < best_loss:
+                    best_loss, self.best_epoch_ = val_losses[epoch], epoch
+                    best_params[...] = self.params_
+            seconds[epoch] = time.perf_counter() - epoch_start
+            if self.verbose and epoch % self.verbose == 0:
+                print("Cost after epoch {0}: {1:.6f}   validation {2:.6f}".format(epoch, losses[epoch], val_losses[epoch]))
+            if self.validation and epoch - self.best_epoch_ >= self.patience:
+                break
+
+        if self.validation:
+            self.params_[...] = best_params
+        else:
+            self.best_epoch_ = epoch
+        self.n_epochs_ = epoch + 1
+        self.fit_time_ = time.perf_counter() - start
+        self.history_ = pd.DataFrame({'loss': losses, 'val_loss': val_losses, 'seconds': seconds})[:self.n_epochs_]
+        return self
+
+    def predict_proba(self, X):
+        X = np.ascontiguousarray(X, dtype=self.dtype)
+        survived = self._forward(X, self._buffers(len(X))).ravel().astype(np.float64)
+        return np.column_stack([1 - survived, survived])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] >= 0.5).astype(np.int64)
+
+
+def benchmark():
+    from sklearn.preprocessing import StandardScaler
+    from labels import test_labels
+    from preprocessing import after_preprocessing
+
+    data = after_preprocessing().to_numpy(dtype=np.float64)
+    scaler = StandardScaler().fit(data[:891])
+    x_train, x_test = scaler.transform(data[:891]), scaler.transform(data[891:])
+    y_train = pd.read_csv('./datasets/train.csv').Survived.to_numpy()
+    y_test = test_labels()
+
+    # the configurations of Results (learning rate 0.008), then early stopped and mini-batch runs
+    for label, params in [('10k epochs, lambda 0.001', dict(epochs=10000, l2=0.001, validation=0)),
+                          ('10k epochs, lambda 0.0001', dict(epochs=10000, l2=0.0001, validation=0)),
+                          ('float64, 10k epochs', dict(epochs=10000, validation=0, dtype=np.float64)),
+                          ('100k epochs, early stopped', dict(epochs=100000, l2=0.001)),
+                          ('mini-batch 64, early stopped', dict(epochs=10000, batch_size=64, patience=50))]:
+        model = MLPClassifier(**params).fit(x_train, y_train)
+        print("{0:30} {1:7} epochs in {2:6.2f}s ({3:6.1f} us/epoch)   train {4:.4f}   test {5:.4f}".format(
+            label, model.n_epochs_, model.fit_time_, model.history_['seconds'].median() * 1e6,
+            model.score(x_train, y_train), model.score(x_test, y_test)))
+
+
+if __name__ == '__main__':
+    benchmark()
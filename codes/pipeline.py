@@ -0,0 +1,268 @@
+import bisect
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import TRAIN_PATH, TEST_PATH, PIPELINE_CONFIG
+from encoding import CategoricalEncoder
+from family_groups import surname, distinction, group_table
+from imputation import AgeImputer
+from tickets import parse_ticket, parse_tickets, merge_prefixes
+from titles import grouping, parse_title, parse_titles, group_titles
+
+
+def _cut(values, bins, labels):
+    # same as pd.cut(values, bins, labels=labels) but returns floats (NaN outside the bins)
+    values = np.asarray(values, dtype=np.float64)
+    position = np.searchsorted(bins, values, side='left') - 1
+    inside = (position >= 0) & (position < len(labels)) & ~np.isnan(values)
+    return np.where(inside, np.asarray(labels, dtype=np.float64)[np.clip(position, 0, len(labels) - 1)], np.nan)
+
+
+def _cut_one(value, bins, labels):
+    position = bisect.bisect_left(bins, value) - 1
+    if 0 <= position < len(labels) and value == value:
+        return float(labels[position])
+    return np.nan
+
+
+def _normalizer_stats(x):
+    # preprocessing.normalizer(x) == (x - mean) * scale
+    x = np.asarray(x, dtype=np.float64)
+    mean = x.mean()
+    return mean, len(x) / np.sum((x - mean) ** 2)
+
+
+# column order of the matrix, one-hot blocks expand to their encoder's columns
+LAYOUT = ['male', 'pclass', 'Fare', 'title', 'ticket', 'cabin', 'embarked_sex', 'age_sex',
+          'age', 'isAlone', 'distinction', 'Age_class', 'f_d', 'f_a']
+
+
+class FeaturePipeline(object):
+    """
+    Stateful version of preprocessing.after_preprocessing().
+
+    fit() learns everything that after_preprocessing() derives from the whole
+    manifest (dummy vocabularies, fill values, age medians, normalizer statistics,
+    surname order and family survival table) once. transform() then turns any
+    batch of passengers into the same fixed column layout and transform_one()
+    does it for a single passenger (a dict) without pandas, for per request scoring.
+
+    fit() on train + test reproduces the after_preprocessing() matrix. With
+    other=True every one-hot block gets an extra column for categories never
+    seen at fit time (they are all zeros otherwise).
+    """
+
+    def __init__(self, config=PIPELINE_CONFIG, other=False):
+        self.config = config
+        self.other = other
+
+    def _titles(self, names):
+        return group_titles(parse_titles(names), self.title_group_).astype(object)
+
+    def _title_one(self, name):
+        t = parse_title(name)
+        return self.title_group_.get(t, t)
+
+    def _tickets(self, tickets):
+        return merge_prefixes(parse_tickets(tickets, missing='XX')['prefix'], self.config['ticket_groups'])
+
+    def _ticket_one(self, ticket):
+        prefix = parse_ticket(ticket, missing='XX')[0]
+        return self.ticket_group_.get(prefix, prefix)
+
+    @staticmethod
+    def _cabins(cabins):
+        return cabins.fillna('Without Cabin').str[0]
+
+    @staticmethod
+    def _embarked_sex(embarked, male):
+        # 1 for men embarked at C and women embarked at S or Q
+        embarked = np.asarray(embarked, dtype=object)
+        return np.where(male, embarked == 'C', (embarked == 'S') | (embarked == 'Q')).astype(np.int64)
+
+    def fit(self, data, survived=None):
+        """
+        Arguments:
+        data -- manifest (train.csv columns without Survived), may include test rows
+        survived -- Series of known outcomes aligned on data's index (NaN / missing / None if unknown)
+        """
+        c = self.config
+        self.title_group_ = grouping(c['title_groups'])
+        self.ticket_group_ = {}
+        for group, members in c['ticket_groups'].items():
+            for member in members:
+                self.ticket_group_.setdefault(member, group)
+
+        male = data['Sex'].to_numpy() == 'male'
+        self.fare_mean_ = data['Fare'].mean()
+        self.age_imputer_ = AgeImputer(by=('Pclass',)).fit(data)
+        age = self.age_imputer_.transform(data)
+        age_label = _cut(age, c['age_bins'], c['age_labels'])
+
+        other = self.other
+        self.encoders_ = {
+            'pclass': CategoricalEncoder(prefix='class', drop=c['pclass_drop'], other=other).fit(data['Pclass']),
+            'title': CategoricalEncoder(drop=c['title_drop'], other=other).fit(self._titles(data['Name'])),
+            'ticket': CategoricalEncoder(drop=c['ticket_drop'], other=other).fit(self._tickets(data['Ticket'])),
+            'cabin': CategoricalEncoder(drop=c['cabin_drop'], other=other).fit(self._cabins(data['Cabin'])),
+            'embarked_sex': CategoricalEncoder(other=other).fit(self._embarked_sex(data['Embarked'], male)),
+            'age_sex': CategoricalEncoder(drop=c['age_sex_drop'], other=other).fit(age_label * np.where(male, 1, -1)),
+        }
+
+        self.age_class_stats_ = _normalizer_stats(age * data['Pclass'])
+
+        # surnames in manifest order: "distinction" is the 1-based rank of the surname
+        last_names = surname(data['Name'])
+        self.surname_keys_ = np.array(sorted(set(last_names + ',')), dtype=object)
+        self.distinction_stats_ = _normalizer_stats(distinction(data['Name'].sort_values()))
+
+        # family survival table of the (surname, ticket) groups
+        self.groups_ = group_table(data['Name'], data['Sex'], data['Ticket'], survived)
+        self.group_table_ = {key: tuple(row) for key, row in zip(self.groups_.index, self.groups_.itertuples(index=False))}
+        self.passenger_ids_ = set(data['PassengerId'])
+
+        self.columns_ = []
+        self.offsets_ = {}
+        for name in LAYOUT:
+            self.offsets_[name] = len(self.columns_)
+            self.columns_ += self.encoders_[name].columns_ if name in self.encoders_ else [name]
+        return self
+
+    def _one_hot(self, matrix, block, values):
+        columns = self.encoders_[block].codes(values)
+        rows = np.flatnonzero(columns >= 0)
+        matrix[rows, self.offsets_[block] + columns[rows]] = 1
+
+    def transform(self, data, groups=None):
+        """
+        Features of a batch of passengers (train.csv columns, Survived optional).
+
+        groups -- optional family table (family_groups.group_table) covering the
+        whole manifest the batch belongs to, e.g. built while streaming a file
+        chunk by chunk; by default the batch is matched against the fit manifest.
+        """
+        c = self.config
+        offsets = self.offsets_
+        matrix = np.zeros((len(data), len(self.columns_)))
+        male = data['Sex'].to_numpy() == 'male'
+
+        matrix[:, offsets['male']] = male
+        self._one_hot(matrix, 'pclass', data['Pclass'])
+        fare = data['Fare'].fillna(self.fare_mean_)
+        matrix[:, offsets['Fare']] = _cut(fare, c['fare_bins'], c['fare_labels'])
+        self._one_hot(matrix, 'title', self._titles(data['Name']))
+        self._one_hot(matrix, 'ticket', self._tickets(data['Ticket']))
+        self._one_hot(matrix, 'cabin', self._cabins(data['Cabin']))
+        self._one_hot(matrix, 'embarked_sex', self._embarked_sex(data['Embarked'], male))
+
+        age = self.age_imputer_.transform(data).to_numpy()
+        age_label = _cut(age, c['age_bins'], c['age_labels'])
+        self._one_hot(matrix, 'age_sex', age_label * np.where(male, 1, -1))
+
+        matrix[:, offsets['age']] = age_label
+        matrix[:, offsets['isAlone']] = (data['SibSp'] + data['Parch']).to_numpy() != 1
+
+        keys = (surname(data['Name']) + ',').to_numpy(dtype=object)
+        position = np.searchsorted(self.surname_keys_, keys)
+        known = self.surname_keys_[np.minimum(position, len(self.surname_keys_) - 1)] == keys
+        rank = np.where(known, position + 1, position + 0.5)  # unseen surnames sit between their neighbours
+        mean, scale = self.distinction_stats_
+        matrix[:, offsets['distinction']] = (rank - mean) * scale
+        mean, scale = self.age_class_stats_
+        matrix[:, offsets['Age_class']] = (age * data['Pclass'].to_numpy() - mean) * scale
+
+        index = pd.MultiIndex.from_arrays([surname(data['Name']).to_numpy(), data['Ticket'].to_numpy()])
+        if groups is None:
+            groups = self.groups_.reindex(index)
+            # passengers that were not part of the fit manifest join their group
+            joining = ~data['PassengerId'].isin(self.passenger_ids_).to_numpy()
+        else:
+            groups = groups.reindex(index)
+            joining = 0
+        in_family = (groups['size'].fillna(0).to_numpy() + joining) > 1
+        matrix[:, offsets['f_d']] = in_family & groups['female_dead'].fillna(False).to_numpy(dtype=bool)
+        matrix[:, offsets['f_a']] = in_family & ~male & groups['female_alive'].fillna(False).to_numpy(dtype=bool)
+
+        return pd.DataFrame(matrix, index=data.index, columns=self.columns_)
+
+    def transform_one(self, record):
+        """
+        Features of a single passenger given as a dict with the train.csv columns
+        (Survived and PassengerId are optional). Returns a 1-D array laid out like columns_.
+        """
+        c = self.config
+        offsets = self.offsets_
+        row = np.zeros(len(self.columns_))
+        male = record['Sex'] == 'male'
+        row[offsets['male']] = male
+
+        def hot(block, value):
+            column = self.encoders_[block].code_one(value)
+            if column >= 0:
+                row[offsets[block] + column] = 1
+
+        hot('pclass', record['Pclass'])
+        fare = record.get('Fare')
+        fare = self.fare_mean_ if fare is None or fare != fare else fare
+        row[offsets['Fare']] = _cut_one(fare, c['fare_bins'], c['fare_labels'])
+        hot('title', self._title_one(record['Name']))
+        hot('ticket', self._ticket_one(record['Ticket']))
+        cabin = record.get('Cabin')
+        hot('cabin', cabin[0] if isinstance(cabin, str) else 'W')
+        embarked = record.get('Embarked')
+        hot('embarked_sex', int(embarked == 'C' if male else embarked in ('S', 'Q')))
+
+        age = self.age_imputer_.impute_one(record)
+        age_label = _cut_one(age, c['age_bins'], c['age_labels'])
+        hot('age_sex', age_label * (1 if male else -1))
+
+        row[offsets['age']] = age_label
+        row[offsets['isAlone']] = record['SibSp'] + record['Parch'] != 1
+
+        last_name = record['Name'].split(',')[0]
+        key = last_name + ','
+        position = bisect.bisect_left(self.surname_keys_, key)
+        known = position < len(self.surname_keys_) and self.surname_keys_[position] == key
+        mean, scale = self.distinction_stats_
+        row[offsets['distinction']] = ((position + 1 if known else position + 0.5) - mean) * scale
+        mean, scale = self.age_class_stats_
+        row[offsets['Age_class']] = (age * record['Pclass'] - mean) * scale
+
+        size, female_dead, female_alive = self.group_table_.get((last_name, record['Ticket']), (0, False, False))
+        if record.get('PassengerId') not in self.passenger_ids_:
+            size += 1
+        row[offsets['f_d']] = size > 1 and female_dead
+        row[offsets['f_a']] = size > 1 and not male and female_alive
+        return row
+
+
+def fit_manifest_pipeline(config=PIPELINE_CONFIG):
+    # the pipeline after_preprocessing() corresponds to: fit on train + test
+    train = pd.read_csv(TRAIN_PATH)
+    test = pd.read_csv(TEST_PATH)
+    survived = train.pop('Survived')
+    data = pd.concat([train, test], ignore_index=True)
+    return FeaturePipeline(config).fit(data, survived), data
+
+
+def benchmark(repeat=10000):
+    pipeline, data = fit_manifest_pipeline()
+    records = data.to_dict('records')
+
+    start = time.time()
+    for i in range(repeat):
+        pipeline.transform_one(records[i % len(records)])
+    single = (time.time() - start) / repeat
+
+    start = time.time()
+    pipeline.transform(data.iloc[:100])
+    batch = time.time() - start
+
+    print("transform_one      : {0:.1f} us / passenger".format(single * 1e6))
+    print("transform(100 rows): {0:.2f} ms".format(batch * 1e3))
+
+
+if __name__ == '__main__':
+    benchmark()
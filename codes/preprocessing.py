@@ -4,6 +4,16 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 from sklearn.preprocessing import StandardScaler
 
+from cache import cache_key
+from config import TRAIN_PATH, TEST_PATH, PIPELINE_CONFIG
+from encoding import CategoricalEncoder
+from feature_store import cached_blocks, cached_frame
+from family_groups import group_survival, distinction
+from imputation import AgeImputer
+from registry import compute, feature
+from tickets import parse_tickets, merge_prefixes
+from titles import grouping, parse_titles, group_titles
+
 
 def normalizer(x):
     m = x.shape[0]
@@ -14,9 +24,6 @@ def normalizer(x):
     return x
 
 
-train = pd.read_csv("./datasets/train.csv")
-
-
 ########### Pclass ################
 # sns.countplot(x='Survived',hue='Pclass',data=train)
 # plt.show()
@@ -59,17 +66,7 @@ train = pd.read_csv("./datasets/train.csv")
 
 ########## Ticket ############
 # ticket = train.Ticket
-def ticket_handler(ticket):
-        ticket = ticket.replace( '.' , '' )
-        ticket = ticket.replace( '/' , '' )
-        ticket = ticket.split()
-        ticket = map( lambda t : t.strip() , ticket )
-        ticket = list(filter( lambda t : not t.isdigit() , ticket ))
-        if len( ticket ) > 0:
-            return (ticket[0])
-        else: 
-            return 'X'
-# ticket = ticket.map( ticket_handler )
+# ticket = parse_tickets(ticket, missing='X')['prefix']
 # ticket = pd.get_dummies(ticket, drop_first=False)
 # print(ticket.head(5))
 # tmp = pd.concat([train['Survived'],ticket], axis=1)
@@ -114,32 +111,34 @@ def ticket_handler(ticket):
 
 
 
-z = pd.DataFrame()
-z['E'] = train['Embarked']
-z['S'] = train['Sex']
-z = pd.get_dummies(z, drop_first=False)
-# print(z.head())
-z['new'] = z['E_C']*z['S_male'] + z['E_S']*z['S_female'] + z['E_Q']*z['S_female']
-z['Survived'] = train['Survived']
-# sns.countplot(x='Survived',hue='new',data=z)
-# plt.show() 
-# print(z[['new', 'Survived']].groupby(['new'], as_index=False).mean().sort_values(by='Survived', ascending=False))
+def interaction_exploration(train):
+    z = pd.DataFrame()
+    z['E'] = train['Embarked']
+    z['S'] = train['Sex']
+    z = pd.get_dummies(z, drop_first=False)
+    # print(z.head())
+    z['new'] = z['E_C']*z['S_male'] + z['E_S']*z['S_female'] + z['E_Q']*z['S_female']
+    z['Survived'] = train['Survived']
+    # sns.countplot(x='Survived',hue='new',data=z)
+    # plt.show() 
+    # print(z[['new', 'Survived']].groupby(['new'], as_index=False).mean().sort_values(by='Survived', ascending=False))
 
 
-z = pd.DataFrame()
-z['A'] = train['Age']
-z['S'] = train['Sex']
-z['S'] = z['S'].replace('male', 1)
-z['S'] = z['S'].replace('female', -1)
-z['N'] = z['S'] * z['A']
-z['N'] = z['N'].mask(z['N'].between(0,11.2), 0)
-z['N'] = z['N'].mask(z['N'].between(-38,-30), 0)
-z['N'] = z['N'].mask(z['N']!=0, 1)
-z['Survived'] = train['Survived']
-# print(z.head())
-# sns.countplot(x='Survived',hue='N',data=z)
-# plt.show() 
-# print(z[['N', 'Survived']].groupby(['N'], as_index=False).mean().sort_values(by='Survived', ascending=False))
+    z = pd.DataFrame()
+    z['A'] = train['Age']
+    z['S'] = train['Sex']
+    z['S'] = z['S'].replace('male', 1)
+    z['S'] = z['S'].replace('female', -1)
+    z['N'] = z['S'] * z['A']
+    z['N'] = z['N'].mask(z['N'].between(0,11.2), 0)
+    z['N'] = z['N'].mask(z['N'].between(-38,-30), 0)
+    z['N'] = z['N'].mask(z['N']!=0, 1)
+    z['Survived'] = train['Survived']
+    # print(z.head())
+    # sns.countplot(x='Survived',hue='N',data=z)
+    # plt.show() 
+    # print(z[['N', 'Survived']].groupby(['N'], as_index=False).mean().sort_values(by='Survived', ascending=False))
+    return z
 
 
 
@@ -198,294 +197,221 @@ def plot_distribution( df , var , target , **kwargs ):
 
 
 
-survived = train['Survived']
-train.drop('Survived', axis=1, inplace=True)
-test = pd.read_csv("./datasets/test.csv")
-data = train.append(test , ignore_index = True)
-data = data.sort_values('Name')
-
-
-
-# data.drop('PassengerId', axis=1, inplace=True)
-# sns.heatmap(data.isnull(), yticklabels=False, cbar=False, cmap='YlGnBu')
-# plt.show()
-
-# print(data.describe())
-# print(data.describe(include=['O']))
-# print(data.info())
-
-"""
-1 nan in Fare
-Embarked has two nans
-Cabin and Age have many nans
-"""
-
-
-passenger_id = data['PassengerId']
-sex = pd.get_dummies(data['Sex'], drop_first=True)
+# the feature sections of build_processed_data() as registry blocks, so that the
+# independent ones (titles, tickets, cabins, family groups, ...) can be computed
+# at the same time; only age -> age_sex / Age_class is a real chain
+PROCESSED = {}
 
-embarked = pd.get_dummies(data['Embarked'], drop_first=False, prefix='Embark') #fills nan with 0 0 0
-embarked.drop('Embark_C', axis=1, inplace=True)
-# embarked.drop('Embark_Q', axis=1, inplace=True)
 
-# pclass = data['Pclass']
-pclass = pd.get_dummies(data['Pclass'], drop_first=False, prefix='class')
-pclass.drop('class_2', axis=1, inplace=True)
-pclass.drop('class_1', axis=1, inplace=True)
+@feature('sex', inputs=['Sex'], registry=PROCESSED)
+def sex_block(data):
+    return CategoricalEncoder(drop_first=True).fit_transform_frame(data['Sex'])
 
 
+@feature('pclass', inputs=['Pclass'], registry=PROCESSED)
+def pclass_block(data, drop=()):
+    return CategoricalEncoder(prefix='class', drop=drop).fit_transform_frame(data['Pclass'])
 
-# sns.boxplot(x='Pclass', y='Age', data=data)
-# plt.show() 
-#### 39 for pclass=1 & 29 pclass=2  & 24 pclass=3
-def age_handler(cols):
-        Age=cols[0]
-        Pclass=cols[1]
-        
-        if pd.isnull(Age):
-            if Pclass==1:
-                return 39
-            elif Pclass==2:
-                return 29
-            else:
-                return 24
-        else:
-            return Age
 
-    
-age = data[['Age', 'Pclass']].apply(age_handler, axis=1)
+@feature('age_years', inputs=['Age', 'Pclass'], cache=False, registry=PROCESSED)
+def age_years_block(data):
+    # sns.boxplot(x='Pclass', y='Age', data=data)
+    # plt.show()
+    #### 39 for pclass=1 & 29 pclass=2  & 24 pclass=3
+    return AgeImputer(by=('Pclass',)).fit(data).transform(data)
 
-bins = (0, 20, 28, 38, 80)   #LR coefficient = -0.29
-# group_names = [0, 1, 2, 3]
-group_names = [1, 2, 3, 4]
-age = pd.cut(age, bins, labels=group_names)
-# data['age'] = age  ## Solving naming issue
 
+@feature('age', requires=['age_years'], registry=PROCESSED)
+def age_block(data, age_years, bins=(), labels=()):
+    #LR coefficient = -0.29
+    return pd.cut(age_years, list(bins), labels=list(labels)).rename('age')
 
 
-fare = data['Fare'].fillna( data.Fare.mean() )
-# print(data.Fare.describe())
-# plt.hist(fare, bins=100)
-# plt.show()
-bins = (-1, 12, 31, 1000)   #LR Coefficient = -0.16
-group_names = [0, 1, 2]
-fare = pd.cut(fare, bins, labels=group_names)
-
-
-
-name = data['Name']
-name = name.map( lambda name: name.split( ',' )[1].split( '.' )[0].strip() )
-name = name.replace(['Lady', 'the Countess','Capt', 'Col','Don', 'Dr', 'Major', 'Rev', 'Sir', 'Jonkheer', 'Dona'], 'Rare')
-name = name.replace(['Mme', 'Mrs', 'Mlle', 'Ms', 'Miss'], 'Female')
-name = pd.get_dummies(name, drop_first=False)
-name.drop('Master', axis=1, inplace=True)
-
-
-
-
-
-ticket = data.Ticket
-def ticket_handler(ticket):
-        ticket = ticket.replace( '.' , '' )
-        ticket = ticket.replace( '/' , '' )
-        ticket = ticket.split()
-        ticket = map( lambda t : t.strip() , ticket )
-        ticket = list(filter( lambda t : not t.isdigit() , ticket ))
-        if len( ticket ) > 0:
-            return (ticket[0])
-        else: 
-            return 'XX'
-ticket = ticket.map( ticket_handler )
-ticket = ticket.replace(['SWPP', 'SC'], 'AAA')
-ticket = ticket.replace('FCC', 'BBB')
-ticket = ticket.replace(['SCAH', 'PP', 'PC'], 'CCC')
-ticket = ticket.replace(['CA', 'WEP'], 'DDD')
-ticket = ticket.replace('LINE', 'EEE')
-ticket = ticket.replace(['SOC', 'SOTONOQ'], 'FFF')
-ticket = ticket.replace(['WC', 'A5'], 'GGG')
-ticket = ticket.replace(['AS', 'CASOTON', 'SP', 'SOTONO2', 'SCA4', 'SOPP', 'SOP', 'FC', 'Fa', 'SCOW', 'A4'], 'HHH')
-ticket = pd.get_dummies(ticket, drop_first=False)
-ticket.drop(['PPP', 'STONO', 'STONO2', 'SCParis', 'SCPARIS', 'XX'], axis=1, inplace=True)
-ticket.drop(['A', 'AQ3', 'AQ4', 'C', 'LP', 'SCA3', 'STONOQ'], axis=1, inplace=True)
-
-
-
-
-
-
-cabin = data.Cabin
-cabin = cabin.fillna( 'Without Cabin' )
-cabin = cabin.map( lambda c : c[0] )
-cabin = cabin.replace(['A','C','F','G','T'], 'drop')
-cabin = pd.get_dummies(cabin, drop_first=False)
-cabin.drop('drop', axis=1, inplace=True)
-
-
-
-siblings = data.SibSp
-parents = data.Parch
-size = siblings + parents
-
-Fare_Per_Person = (data['Fare'].fillna(data.Fare.mean()))/ (size + 1)
-Age_class = data[['Age', 'Pclass']].apply(age_handler, axis=1) * data['Pclass']
-
-
-isAlone = size.map( lambda s : 'Alone' if s == 1 else 'Not Alone' )
-isAlone = pd.get_dummies(isAlone, drop_first=True)
-siblings = pd.get_dummies(siblings, drop_first=False)
-# siblings.drop([1,2,3,4,5,8], axis=1, inplace=True)
-
-
-family = pd.DataFrame()
-family['Name'] = data['Name']
-family['Name'] = family['Name'].map( lambda nam: nam.split( ',' )[0])
-family['distinction'] = 0
-last = ''
-last_index = 0
-
-for index, row in family.iterrows():
-    if row['Name']==last :
-        family.loc[index, 'distinction'] = last_index
-    else:
-        last_index += 1
-        last = row['Name']
-        family.loc[index, 'distinction'] = last_index
-
-family['distinction'] = normalizer(family['distinction'])
-
-
-
-families = pd.DataFrame()
-families['Sex'] = data['Sex']
-families['PassengerId'] = data['PassengerId']
-families['Name'] = data['Name'].map( lambda nam: nam.split( ',' )[0])
-families['Survived'] = survived
-families['Survived'] = families['Survived'].fillna(-1)
-families['Ticket'] = data['Ticket']
-families['male_alive'] = 0
-families['male_dead'] = 0
-families['female_dead'] = 0
-families['female_alive'] = 0
-# print(families.head())
-
-
-for grp, grp_df in families.groupby(['Name','Ticket']):
-    if (len(grp_df) != 1): # a family
-        male_alive = 0
-        male_dead = 0
-        female_dead = 0
-        female_alive = 0
-        for ind, row in grp_df.iterrows():
-            if row['Survived']==1 and row['Sex']=='male':
-                male_alive=1
-            elif row['Survived']==0 and row['Sex']=='male':
-                male_dead=1
-            elif row['Survived']==1 and row['Sex']=='female':
-                female_alive=1
-            elif row['Survived']==0 and row['Sex']=='female':
-                female_dead=1
-        for ind, row in grp_df.iterrows():
-            passID = row['PassengerId']
-            if row['Sex']=='male':
-                families.loc[families['PassengerId'] == passID, 'male_alive'] = male_alive
-                families.loc[families['PassengerId'] == passID, 'male_dead'] = male_dead
-                families.loc[families['PassengerId'] == passID, 'female_dead'] = female_dead
-            else:
-                families.loc[families['PassengerId'] == passID, 'male_alive'] = male_alive
-                families.loc[families['PassengerId'] == passID, 'female_dead'] = female_dead
-                families.loc[families['PassengerId'] == passID, 'female_alive'] = female_alive
-
-
-
-z = pd.DataFrame()
-z['E'] = data['Embarked']
-z['S'] = data['Sex']
-z = pd.get_dummies(z, drop_first=False)
-z['new'] = z['E_C']*z['S_male'] + z['E_S']*z['S_female'] + z['E_Q']*z['S_female']
-my_feature = pd.DataFrame()
-my_feature['feature'] = z['new']
-my_feature = pd.get_dummies(my_feature['feature'], drop_first=False)
-
-
-z = pd.DataFrame()
-z['S'] = data['Sex']
-z['S'] = z['S'].replace('male', 1)
-z['S'] = z['S'].replace('female', -1)
-z['N'] = z['S'] * train['Age']
-z['N'] = z['N'].mask(z['N'].between(0,11.2), 0)
-z['N'] = z['N'].mask(z['N'].between(-38,-30), 0)
-z['N'] = z['N'].mask(z['N']!=0, 'Y')
-my_feature2 = z['N']
-my_feature2 = my_feature2.replace(0, 'X')
-my_feature2 = my_feature2.replace(1, 'Y')
-my_feature2 = pd.get_dummies(my_feature2, drop_first=False)
-my_feature2.drop('Y', axis=1, inplace=True)
-# print(my_feature2.head())
-
-
-
-
-############## other features #########################
-# sexx = train['Sex']
-# sexx = sexx.replace('male', 1)
-# sexx = sexx.replace('female', -1)
-# age_sex = age.astype(np.int8) * sexx
-# tmp = pd.DataFrame()
-# tmp['survived'] = survived
-# tmp['age_sex'] = age_sex
-# sns.countplot(x='survived',hue='age_sex',data=tmp)
-# plt.show()
-# print(tmp[['age_sex', 'survived']].groupby(['age_sex'], as_index=False).mean().sort_values(by='survived', ascending=False))
+@feature('Age_class', inputs=['Pclass'], requires=['age_years'], registry=PROCESSED)
+def age_class_block(data, age_years):
+    return normalizer(age_years * data['Pclass']).rename('Age_class')
 
 
-sexx = data['Sex']
-sexx = sexx.replace('male', 1)
-sexx = sexx.replace('female', -1)
-age_sex = age.astype(np.int8) * sexx
-age_sex = pd.get_dummies(age_sex, drop_first=False)
-age_sex.drop([-4,-3,-2,-1,2,3,4], axis=1, inplace=True)
+@feature('age_sex', inputs=['Sex'], requires=['age'], registry=PROCESSED)
+def age_sex_block(data, age, drop=()):
+    sexx = data['Sex']
+    sexx = sexx.replace('male', 1)
+    sexx = sexx.replace('female', -1)
+    age_sex = age.astype(np.int8) * sexx
+    return CategoricalEncoder(drop=drop).fit_transform_frame(age_sex)
 
 
-processed_data = pd.concat([sex,pclass,fare,name,ticket,cabin,my_feature,age_sex], axis=1)
-processed_data['age'] = age
-processed_data['isAlone'] = isAlone
-processed_data['distinction'] = family['distinction']
-processed_data['id'] = passenger_id
+@feature('fare', inputs=['Fare'], registry=PROCESSED)
+def fare_block(data, bins=(), labels=()):
+    # print(data.Fare.describe())
+    # plt.hist(fare, bins=100)
+    # plt.show()
+    fare = data['Fare'].fillna( data.Fare.mean() )
+    #LR Coefficient = -0.16
+    return pd.cut(fare, list(bins), labels=list(labels))
 
 
+@feature('name', inputs=['Name'], registry=PROCESSED)
+def name_block(data, groups=None, drop=()):
+    name = group_titles(parse_titles(data['Name']), grouping(groups))
+    return CategoricalEncoder(drop=drop).fit_transform_frame(name)
 
-Fare_Per_Person = normalizer(Fare_Per_Person)
-# processed_data['Fare_Per_Person'] = Fare_Per_Person
-Age_class = normalizer(Age_class)
-processed_data['Age_class'] = Age_class
 
-# age = data[['Age', 'Pclass']].apply(age_handler, axis=1)
-# age = normalizer(age)
-# processed_data['age'] = age
+@feature('ticket', inputs=['Ticket'], registry=PROCESSED)
+def ticket_block(data, groups=None, drop=()):
+    ticket = parse_tickets(data.Ticket, missing='XX')['prefix']
+    ticket = merge_prefixes(ticket, groups)
+    return CategoricalEncoder(drop=drop).fit_transform_frame(ticket)
 
-# fare = data['Fare'].fillna(data.Fare.mean())
-# fare = normalizer(fare)
-# processed_data['fare'] = fare
 
-# processed_data['m_a'] = families['male_alive']
-# processed_data['m_d'] = families['male_dead'] 
-processed_data['f_d'] = families['female_dead'] 
-processed_data['f_a'] = families['female_alive'] 
+@feature('cabin', inputs=['Cabin'], registry=PROCESSED)
+def cabin_block(data, drop=()):
+    cabin = data.Cabin
+    cabin = cabin.fillna( 'Without Cabin' )
+    cabin = cabin.map( lambda c : c[0] )
+    return CategoricalEncoder(drop=drop).fit_transform_frame(cabin)
 
-processed_data = processed_data.sort_values('id')
-processed_data.drop('id', axis=1, inplace=True)
 
+@feature('my_feature', inputs=['Embarked', 'Sex'], registry=PROCESSED)
+def my_feature_block(data):
+    z = pd.concat([CategoricalEncoder(prefix='E').fit_transform_frame(data['Embarked']),
+                   CategoricalEncoder(prefix='S').fit_transform_frame(data['Sex'])], axis=1)
+    z['new'] = z['E_C']*z['S_male'] + z['E_S']*z['S_female'] + z['E_Q']*z['S_female']
+    return CategoricalEncoder().fit_transform_frame(z['new'])
 
-# print(processed_data.head())
 
+@feature('isAlone', inputs=['SibSp', 'Parch'], registry=PROCESSED)
+def is_alone_block(data):
+    size = data.SibSp + data.Parch
+    isAlone = size.map( lambda s : 'Alone' if s == 1 else 'Not Alone' )
+    return CategoricalEncoder(drop_first=True).fit_transform_frame(isAlone).iloc[:, 0].rename('isAlone')
 
-#   if __name__ == '__main__':
-def after_preprocessing():
-    return processed_data
 
+@feature('distinction', inputs=['Name'], registry=PROCESSED)
+def distinction_block(data):
+    # the manifest is sorted by name, see processed_manifest()
+    return normalizer(distinction(data['Name'])).rename('distinction')
 
 
+@feature('families', inputs=['Name', 'Sex', 'Ticket', 'Survived'], registry=PROCESSED)
+def families_block(data):
+    families = group_survival(data['Name'], data['Sex'], data['Ticket'], data['Survived'])
+    # processed_data['m_a'] = families['male_alive']
+    # processed_data['m_d'] = families['male_dead']
+    return families[['female_dead', 'female_alive']].rename(columns={'female_dead': 'f_d', 'female_alive': 'f_a'})
 
 
+# blocks of the processed matrix, in its column order
+PROCESSED_BLOCKS = ['sex', 'pclass', 'fare', 'name', 'ticket', 'cabin', 'my_feature', 'age_sex',
+                    'age', 'isAlone', 'distinction', 'Age_class', 'families']
 
 
+def processed_params(config=PIPELINE_CONFIG):
+    # the PIPELINE_CONFIG entries every block is called with
+    return {
+        'pclass': {'drop': config['pclass_drop']},
+        'age': {'bins': config['age_bins'], 'labels': config['age_labels']},
+        'age_sex': {'drop': config['age_sex_drop']},
+        'fare': {'bins': config['fare_bins'], 'labels': config['fare_labels']},
+        'name': {'groups': config['title_groups'], 'drop': config['title_drop']},
+        'ticket': {'groups': config['ticket_groups'], 'drop': config['ticket_drop']},
+        'cabin': {'drop': config['cabin_drop']},
+    }
+
+
+def processed_manifest():
+    # train + test sorted by name, Survived missing on the test rows
+    train = pd.read_csv(TRAIN_PATH)
+    test = pd.read_csv(TEST_PATH)
+    data = train.append(test , ignore_index = True)
+    data = data.sort_values('Name')
+
+    # data.drop('PassengerId', axis=1, inplace=True)
+    # sns.heatmap(data.isnull(), yticklabels=False, cbar=False, cmap='YlGnBu')
+    # plt.show()
+
+    # print(data.describe())
+    # print(data.describe(include=['O']))
+    # print(data.info())
+
+    """
+    1 nan in Fare
+    Embarked has two nans
+    Cabin and Age have many nans
+    """
+    return data
+
+
+def build_processed_data(config=PIPELINE_CONFIG, workers=1, backend='process', data=None):
+    """
+    The processed feature matrix, sorted by PassengerId.
+
+    workers > 1 computes the independent blocks of PROCESSED at the same time
+    (registry.compute, on `backend` workers); the matrix does not depend on it.
+    data -- manifest laid out like processed_manifest(), read from the CSV files by default
+    """
+    data = processed_manifest() if data is None else data
+    processed_data = compute(PROCESSED_BLOCKS, data, params=processed_params(config), registry=PROCESSED,
+                             workers=workers, backend=backend)
+    return processed_data.reindex(data['PassengerId'].sort_values().index)
+
+
+
+_processed_data = None
+
+
+def processed_blocks():
+    """
+    The matrix of after_preprocessing() straight from the feature store, without
+    building a DataFrame: (one_hot, numeric, index, columns), the 0/1 columns as
+    a uint8 memory map and the others as a float64 one (see feature_store.load_blocks).
+    """
+    key = cache_key([TRAIN_PATH, TEST_PATH], PIPELINE_CONFIG)
+    return cached_blocks('processed_data', key, build_processed_data, float_dtype=np.float64)
+
+
+def after_preprocessing(use_cache=True, workers=1):
+    """
+    Feature matrix of train + test (sorted by PassengerId, train rows first).
+
+    With use_cache=True it is built on the first call only; the result is kept
+    in memory and in the feature store (./datasets/cache/features) under a key
+    made of the contents of train.csv / test.csv and PIPELINE_CONFIG, so later
+    runs just load it back. Every call returns a copy of the memoized frame, so
+    callers may modify it. use_cache=False always rebuilds it and leaves both
+    caches alone. workers -- see build_processed_data(), when it has to be built.
+    """
+    global _processed_data
+    if not use_cache:
+        return build_processed_data(workers=workers)
+    if _processed_data is None:
+        key = cache_key([TRAIN_PATH, TEST_PATH], PIPELINE_CONFIG)
+        # float64 keeps the stored matrix bit-identical to build_processed_data()
+        _processed_data = cached_frame('processed_data', key, lambda: build_processed_data(workers=workers),
+                                       float_dtype=np.float64)
+    return _processed_data.copy()
+
+
+def benchmark(n=2 * 10 ** 6, workers=(1, 2, 4), backend='process'):
+    import os
+    import time
+
+    # train + test resampled to n passengers, laid out like processed_manifest()
+    data = processed_manifest()
+    rng = np.random.RandomState(0)
+    data = data.iloc[rng.randint(0, len(data), n)].reset_index(drop=True)
+    data['PassengerId'] = np.arange(n)
+    data = data.sort_values('Name', kind='mergesort')
+
+    print("rows = {0}   cpus = {1}   backend = {2}".format(n, os.cpu_count(), backend))
+    reference = None
+    for w in workers:
+        start = time.time()
+        processed = build_processed_data(workers=w, backend=backend, data=data)
+        seconds = time.time() - start
+        reference = seconds if reference is None else reference
+        print("workers = {0}   {1:.1f}s   speedup = {2:.2f}   shape = {3}".format(w, seconds, reference / seconds, processed.shape))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,229 @@
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+
+from cache import config_digest
+from feature_store import STORE_DIR, exists, load_frame, save_frame
+
+
+class Feature(object):
+    """
+    A registered feature block: the function computing it, the manifest columns
+    it reads (inputs), the columns it produces (outputs, None if they depend on
+    the data) and the other blocks it is computed from (requires).
+    """
+
+    def __init__(self, name, function, inputs, outputs, requires, version, cache):
+        self.name = name
+        self.function = function
+        self.inputs = list(inputs)
+        self.outputs = None if outputs is None else list(outputs)
+        self.requires = list(requires)
+        self.version = version
+        self.cache = cache
+
+
+FEATURES = {}
+
+
+def feature(name, inputs=(), outputs=None, requires=(), version=1, cache=True, registry=FEATURES):
+    """
+    Decorator registering function as the feature block `name`.
+
+    function is called as function(data, **{block: result for block in requires})
+    (plus the block's params of compute()) where data only holds the `inputs`
+    columns (a copy, so it may be modified) and cached blocks come as the
+    DataFrame they were stored as. It returns a Series, a DataFrame or a tuple
+    of them. Bump version when the function
+    changes so its stored result is rebuilt. cache=False is meant for
+    intermediate results (e.g. parsed strings) shared by several blocks, which
+    are recomputed when needed instead of being stored.
+    """
+    def register(function):
+        registry[name] = Feature(name, function, inputs, outputs, requires, version, cache)
+        return function
+    return register
+
+
+def block_of(name, registry=FEATURES):
+    # a feature is requested by block name or by one of its declared output columns
+    if name in registry:
+        return name
+    for block in registry.values():
+        if block.outputs is not None and name in block.outputs:
+            return block.name
+    raise KeyError("unknown feature: {0}".format(name))
+
+
+def resolve(names, registry=FEATURES):
+    """
+    Blocks needed for the requested features, dependencies first
+    (depth first topological order of the requires DAG).
+    """
+    order = []
+    state = {}
+
+    def visit(name, path):
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise ValueError("circular feature dependency: {0}".format(' -> '.join(path + [name])))
+        if name not in registry:
+            raise KeyError("unknown feature: {0}".format(name))
+        state[name] = 'visiting'
+        for dependency in registry[name].requires:
+            visit(dependency, path + [name])
+        state[name] = 'done'
+        order.append(name)
+
+    for name in names:
+        visit(block_of(name, registry), [])
+    return order
+
+
+def _as_frame(result):
+    if isinstance(result, tuple):
+        return pd.concat(result, axis=1)
+    if isinstance(result, pd.Series):
+        return result.to_frame()
+    return result
+
+
+# manifest of the running compute(), inherited by forked workers instead of being sent to them
+_shared = {}
+
+
+def _share(manifest):
+    _shared['manifest'] = manifest
+
+
+def _run_block(function, inputs, dependencies, params):
+    return function(_shared['manifest'][inputs].copy(), **dict(dependencies, **params))
+
+
+def _executor(workers, backend, manifest):
+    if backend == 'thread':
+        return ThreadPoolExecutor(workers)
+    if backend != 'process':
+        raise ValueError("backend must be 'thread' or 'process', not {0!r}".format(backend))
+    # fork: the workers see the manifest copy-on-write and find the registered functions already imported
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    return ProcessPoolExecutor(workers, mp_context=context, initializer=_share, initargs=(manifest,))
+
+
+def compute(names, data, key=None, params=None, registry=FEATURES, store_dir=STORE_DIR, workers=1, backend='process'):
+    """
+    Frame of the requested features, computing only the blocks they need.
+
+    Arguments:
+    names -- block names or output columns, in the wanted column order
+    data -- the manifest, or a function returning it (only called if some block
+            has to be computed)
+    key -- cache_key of the source data; when given every cached block is stored
+           on its own in the feature store, under a key that also covers its
+           version and the keys of the blocks it requires, so changing one
+           block only rebuilds that block and the blocks computed from it
+    params -- {block: {argument: value}}, extra keyword arguments of the block
+              functions (part of their cache key as well)
+    workers -- number of blocks computed at the same time; every block whose
+               requirements are ready is handed to a pool of `backend`
+               ('thread' or 'process') workers. The column order of the
+               result does not depend on it.
+    """
+    order = resolve(names, registry)  # also checks every name and the DAG
+    params = params or {}
+    block_keys = {}
+    if key is not None:
+        for name in order:
+            block = registry[name]
+            block_keys[name] = config_digest({
+                'data': key, 'block': name, 'version': block.version, 'params': params.get(name, {}),
+                'requires': [block_keys[dependency] for dependency in block.requires],
+            })[:16]
+
+    def stored(name):
+        return key is not None and registry[name].cache and exists('feature-' + name, block_keys[name], store_dir)
+
+    # blocks to compute: the requested ones that are not stored, and what they require
+    results = {}
+    pending = []
+
+    def need(name):
+        if name in results or name in pending:
+            return
+        if stored(name):
+            results[name] = load_frame('feature-' + name, block_keys[name], store_dir)
+            return
+        for dependency in registry[name].requires:
+            need(dependency)
+        pending.append(name)
+
+    for name in names:
+        need(block_of(name, registry))
+
+    def finish(name, result):
+        if key is not None and registry[name].cache:
+            save_frame(_as_frame(result), 'feature-' + name, block_keys[name], store_dir=store_dir)
+            result = load_frame('feature-' + name, block_keys[name], store_dir)
+        results[name] = result
+
+    if pending:
+        manifest = data() if callable(data) else data
+        _share(manifest)
+        try:
+            if workers <= 1:
+                for name in pending:
+                    block = registry[name]
+                    dependencies = {d: results[d] for d in block.requires}
+                    finish(name, _run_block(block.function, block.inputs, dependencies, params.get(name, {})))
+            else:
+                with _executor(workers, backend, manifest) as executor:
+                    running = {}
+                    while pending or running:
+                        for name in [n for n in pending if all(d in results for d in registry[n].requires)]:
+                            block = registry[name]
+                            dependencies = {d: results[d] for d in block.requires}
+                            future = executor.submit(_run_block, block.function, block.inputs, dependencies, params.get(name, {}))
+                            running[future] = name
+                            pending.remove(name)
+                        done, _ = wait(running, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            finish(running.pop(future), future.result())
+        finally:
+            _shared.clear()
+
+    frames = []
+    for name in names:
+        block = block_of(name, registry)
+        frame = _as_frame(results[block])
+        frames.append(frame[[name]] if name != block else frame)
+    return pd.concat(frames, axis=1)
+
+
+def benchmark(n=2 * 10 ** 6, workers=(1, 2, 4), backend='process'):
+    import os
+    import time
+
+    import numpy as np
+    from feature_handling import load_manifest
+
+    features = ['sex', 'embarked', 'pclass', 'age', 'fare', 'name', 'ticket', 'cabin',
+                'siblings', 'parents', 'size', 'isAlone']
+    manifest = load_manifest()
+    rng = np.random.RandomState(0)
+    manifest = manifest.iloc[rng.randint(0, len(manifest), n)].reset_index(drop=True)
+
+    print("rows = {0}   cpus = {1}   backend = {2}".format(n, os.cpu_count(), backend))
+    reference = None
+    for w in workers:
+        start = time.time()
+        full = compute(features, manifest, workers=w, backend=backend)
+        seconds = time.time() - start
+        reference = seconds if reference is None else reference
+        print("workers = {0}   {1:.1f}s   speedup = {2:.2f}   shape = {3}".format(w, seconds, reference / seconds, full.shape))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,166 @@
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+
+from validation import cross_validate
+
+
+def _binary_columns(X):
+    return np.all((X == 0) | (X == 1), axis=0)
+
+
+def binary_scores(X, y, method='mi'):
+    """
+    Mutual information (nats) or chi² statistic of every 0/1 column with a 0/1
+    target, all columns at once from their 2x2 contingency tables:
+    the counts of (column = 1, y = 1) are one matrix product X.T @ y.
+    Non-binary columns score NaN.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    ones = X.sum(axis=0)               # column = 1
+    both = X.T @ y                     # column = 1, y = 1
+    positives = y.sum()
+    # observed counts of the 4 cells, shape (4, n_columns)
+    observed = np.array([n - ones - positives + both, ones - both, positives - both, both])
+    row = np.array([n - ones, ones, n - ones, ones])
+    column = np.array([np.full_like(ones, n - positives), np.full_like(ones, n - positives),
+                       np.full_like(ones, positives), np.full_like(ones, positives)])
+    expected = row * column / n
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if method == 'mi':
+            scores = np.where(observed > 0, observed / n * np.log(observed / expected), 0).sum(axis=0)
+        elif method == 'chi2':
+            scores = np.where(expected > 0, (observed - expected) ** 2 / expected, 0).sum(axis=0)
+        else:
+            raise ValueError("method must be 'mi' or 'chi2', not {0!r}".format(method))
+    return np.where(_binary_columns(X), scores, np.nan)
+
+
+def prefilter(X, y, keep=None, threshold=None, method='mi'):
+    """
+    Indices of the columns worth a model refit: non-binary columns always,
+    binary columns if their score (binary_scores) is at least threshold and
+    among the `keep` best binary columns.
+    """
+    scores = binary_scores(X, y, method)
+    binary = ~np.isnan(scores)
+    selected = ~binary
+    candidates = np.flatnonzero(binary & (scores >= (threshold if threshold is not None else -np.inf)))
+    if keep is not None:
+        candidates = candidates[np.argsort(-scores[candidates], kind='mergesort')[:keep]]
+    selected[candidates] = True
+    return np.flatnonzero(selected)
+
+
+def _importances(model):
+    if hasattr(model, 'coef_'):
+        return np.abs(np.atleast_2d(model.coef_)).sum(axis=0)
+    if hasattr(model, 'feature_importances_'):
+        return model.feature_importances_
+    raise ValueError("{0} has neither coef_ nor feature_importances_".format(type(model).__name__))
+
+
+def schedule(n_features, fraction=0.2, fine_below=15):
+    # features dropped in the next elimination step: a fraction of them early, one at a time near the end
+    if n_features > fine_below:
+        return max(1, int(n_features * fraction))
+    return 1
+
+
+class SelectionResult(object):
+    """
+    Outcome of eliminate(): the selected columns (indices, their positions in the
+    original columns, and names when X was a DataFrame) and the cross validated
+    score of every feature count that was evaluated (scores, a DataFrame).
+    """
+
+    def __init__(self, indices, names, scores, wall_time):
+        self.indices = indices
+        self.names = names
+        self.scores = scores
+        self.wall_time = wall_time
+
+    @property
+    def n_features(self):
+        return len(self.indices)
+
+    def __repr__(self):
+        return "SelectionResult({0} features, score {1:.4f}, {2} steps, {3:.1f}s)".format(
+            self.n_features, self.scores['mean'].max(), len(self.scores), self.wall_time)
+
+
+def eliminate(model, X, y, fraction=0.2, fine_below=15, min_features=1, patience=10, tol=1e-4,
+              n_splits=5, workers=1, seed=None, prefilter_keep=None, prefilter_method='mi'):
+    """
+    Recursive feature elimination with a schedule instead of RFECV's fixed step.
+
+    The candidate columns are first cut down by prefilter() (prefilter_keep
+    binary columns at most, None: no pre-filter). Then, repeatedly: the current
+    columns are cross validated (folds in parallel on `workers` processes,
+    see validation.cross_validate), the model is fitted once on all the rows
+    and the least important columns are dropped, schedule(n, fraction,
+    fine_below) of them. The elimination stops at min_features or when the
+    score has not beaten the best one by tol for `patience` single-feature
+    steps in a row (the coarse steps never stop it; patience=None: no early
+    stopping).
+
+    Returns a SelectionResult for the best feature count seen.
+    """
+    start = time.time()
+    names = list(X.columns) if hasattr(X, 'columns') else None
+    X = X.values if hasattr(X, 'values') else np.asarray(X)
+    y = y.values if hasattr(y, 'values') else np.asarray(y)
+    X = X.astype(np.float64)
+
+    current = np.arange(X.shape[1]) if prefilter_keep is None else prefilter(X, y, prefilter_keep, method=prefilter_method)
+    rows = []
+    best, best_score, stale, drop = current, -np.inf, 0, 0
+    while True:
+        result = cross_validate(clone(model), X[:, current], y, n_splits=n_splits, stratified=True,
+                                seed=seed, workers=workers)
+        rows.append({'n_features': len(current), 'mean': result.mean, 'std': result.std})
+        if result.mean > best_score + tol:
+            best, best_score, stale = current, result.mean, 0
+        elif drop == 1:
+            stale += 1
+        if len(current) <= min_features or (patience is not None and stale >= patience):
+            break
+
+        fitted = clone(model).fit(X[:, current], y)
+        drop = min(schedule(len(current), fraction, fine_below), len(current) - min_features)
+        order = np.argsort(_importances(fitted), kind='mergesort')
+        current = np.sort(current[np.sort(order[drop:])])
+
+    scores = pd.DataFrame(rows).set_index('n_features')
+    selected = [names[i] for i in best] if names is not None else None
+    return SelectionResult(best, selected, scores, time.time() - start)
+
+
+def benchmark():
+    from sklearn.feature_selection import RFECV
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import StratifiedKFold
+    from preprocessing import after_preprocessing
+
+    X = after_preprocessing()[:891].to_numpy(dtype=np.float64)
+    y = pd.read_csv('./datasets/train.csv').Survived.to_numpy()
+    model = LogisticRegression(max_iter=1000)
+
+    start = time.time()
+    rfecv = RFECV(model, step=1, cv=StratifiedKFold(5), scoring='accuracy').fit(X, y)
+    print("RFECV step=1       {0:.2f}s   {1} features   score {2:.4f}".format(
+        time.time() - start, rfecv.n_features_, rfecv.cv_results_['mean_test_score'].max()))
+
+    for keep in [None, 20]:
+        result = eliminate(model, X, y, prefilter_keep=keep)
+        print("eliminate (keep={0:4}) {1:.2f}s   {2} features   score {3:.4f}   {4} evaluations".format(
+            str(keep), result.wall_time, result.n_features, result.scores['mean'].max(), len(result.scores)))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,238 @@
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from cache import CACHE_DIR, array_digest, config_digest, estimator_key, load, save, stored
+
+
+PREDICTION_DIR = os.path.join(CACHE_DIR, "predictions")
+OOF_DIR = os.path.join(CACHE_DIR, "oof")
+
+
+# matrices of the running base_predictions() / oof_predictions(), inherited by forked workers
+# instead of being pickled with every task
+_shared = {}
+
+
+def _share(x_train, y_train, x_test):
+    _shared.update(x_train=x_train, y_train=y_train, x_test=x_test)
+
+
+def _pool(workers, x_train, y_train, x_test):
+    # fork: the initializer arguments are inherited, not pickled; only the models and fold indices are sent per task
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    return ProcessPoolExecutor(workers, mp_context=context, initializer=_share, initargs=(x_train, y_train, x_test))
+
+
+def _estimator(model):
+    # ensemble.SklearnHelper wraps the estimator in .clf
+    return getattr(model, 'clf', model)
+
+
+def _predict(model, x, proba=False):
+    """
+    Hard labels, or with proba=True the probability of the positive class
+    (the decision_function for models without predict_proba, e.g. SVC(probability=False)).
+    """
+    if proba:
+        if hasattr(model, 'predict_proba'):
+            return model.predict_proba(x)[:, 1]
+        if hasattr(model, 'decision_function'):
+            return model.decision_function(x)
+    return model.predict(x)
+
+
+def fit_predict(model, x_train, y_train, x_test):
+    model.fit(x_train, y_train)
+    return model.predict(x_train), model.predict(x_test)
+
+
+def _fit_predict_shared(model):
+    return fit_predict(model, _shared['x_train'], _shared['y_train'], _shared['x_test'])
+
+
+def base_predictions(models, x_train, y_train, x_test, workers=1, use_cache=True, cache_dir=PREDICTION_DIR):
+    """
+    Train / test predictions of every base model of a stacking level.
+
+    The predictions of each model are stored under estimator_key(model, x_train,
+    y_train, x_test), i.e. its class, its parameters and the content of the
+    matrices, so only the models that changed (or that see new features) are
+    fitted again; those are fitted side by side on `workers` processes.
+
+    Returns:
+    y_trains, y_tests -- lists of prediction arrays, in the order of models
+    """
+    names = [type(model).__name__ for model in models]
+    keys = [estimator_key(model, x_train, y_train, x_test) if use_cache else None for model in models]
+    missing = [i for i, key in enumerate(keys) if key is None or not stored(names[i], key, cache_dir)]
+
+    if workers > 1 and len(missing) > 1:
+        with _pool(workers, x_train, y_train, x_test) as executor:
+            futures = {i: executor.submit(_fit_predict_shared, models[i]) for i in missing}
+            fitted = {i: future.result() for i, future in futures.items()}
+    else:
+        fitted = {i: fit_predict(models[i], x_train, y_train, x_test) for i in missing}
+
+    predictions = []
+    for i, key in enumerate(keys):
+        if key is not None and i in fitted:
+            save(names[i], key, fitted[i], cache_dir)
+        predictions.append(fitted[i] if i in fitted else load(names[i], key, cache_dir))
+    return [p[0] for p in predictions], [p[1] for p in predictions]
+
+
+def fit_fold(model, x_train, y_train, x_test, train_index, test_index, proba=False):
+    # one (model, fold) job: predictions for the held out rows and for the test set
+    model.fit(x_train[train_index], y_train[train_index])
+    return _predict(model, x_train[test_index], proba), _predict(model, x_test, proba)
+
+
+def _fit_fold_shared(model, train_index, test_index, proba):
+    return fit_fold(model, _shared['x_train'], _shared['y_train'], _shared['x_test'], train_index, test_index, proba)
+
+
+def oof_predictions(models, x_train, y_train, x_test, folds, workers=1, proba=False,
+                    use_cache=True, cache_dir=OOF_DIR):
+    """
+    Out-of-fold predictions of every model, the inputs of the next stacking level.
+
+    All the (model, fold) pairs are scheduled at once on `workers` processes.
+    Every finished fold is written to cache_dir straight away, under a key made
+    of the model (class and parameters), the matrices, the fold and proba, so an
+    interrupted run resumes with the folds that are still missing and a re-run
+    with unchanged models only reads the cache.
+
+    Arguments:
+    models -- {name: estimator} (sklearn estimators or ensemble.SklearnHelper)
+    folds -- list of (train_index, test_index), e.g. list(KFold(5).split(x_train))
+    proba -- probability of survival instead of the hard label
+    Returns:
+    {name: (oof_train, oof_test)} -- (n_train, 1) out-of-fold predictions and
+    (n_test, 1) test predictions averaged over the folds
+    """
+    x_train, y_train, x_test = np.asarray(x_train), np.asarray(y_train), np.asarray(x_test)
+    models = {name: _estimator(model) for name, model in models.items()}
+
+    jobs = {}
+    for name, model in models.items():
+        model_key = estimator_key(model, x_train, y_train, x_test) if use_cache else None
+        for i, (train_index, test_index) in enumerate(folds):
+            key = None
+            if use_cache:
+                key = config_digest({'model': model_key, 'fold': i, 'proba': proba,
+                                     'index': array_digest(train_index, test_index)})[:16]
+            jobs[(name, i)] = key
+
+    results = {job: load(job[0], key, cache_dir) for job, key in jobs.items()
+               if key is not None and stored(job[0], key, cache_dir)}
+    missing = [job for job in jobs if job not in results]
+
+    def finish(job, result):
+        if jobs[job] is not None:
+            save(job[0], jobs[job], result, cache_dir)
+        results[job] = result
+
+    if workers > 1 and len(missing) > 1:
+        with _pool(workers, x_train, y_train, x_test) as executor:
+            futures = {executor.submit(_fit_fold_shared, models[name], folds[i][0], folds[i][1], proba): (name, i)
+                       for name, i in missing}
+            for future in as_completed(futures):
+                finish(futures[future], future.result())
+    else:
+        for name, i in missing:
+            finish((name, i), fit_fold(models[name], x_train, y_train, x_test, folds[i][0], folds[i][1], proba))
+
+    oof = {}
+    for name in models:
+        oof_train = np.zeros((len(x_train),))
+        oof_test_skf = np.empty((len(folds), len(x_test)))
+        for i, (train_index, test_index) in enumerate(folds):
+            oof_train[test_index], oof_test_skf[i, :] = results[(name, i)]
+        oof[name] = oof_train.reshape(-1, 1), oof_test_skf.mean(axis=0).reshape(-1, 1)
+    return oof
+
+
+# the second level of implementation.py / ensemble.py, with the histogram tree method
+META_PARAMS = {'max_depth': 4, 'min_child_weight': 2, 'gamma': 0.9, 'subsample': 0.8, 'colsample_bytree': 0.8,
+               'objective': 'binary:logistic', 'nthread': -1, 'scale_pos_weight': 1, 'tree_method': 'hist'}
+
+
+def fit_meta(x_train, y_train, n_splits=5, max_rounds=2000, early_stopping_rounds=50, seed=0, **params):
+    """
+    XGBoost meta-model, with as many boosting rounds as the data supports
+    instead of a fixed 2000.
+
+    Every one of n_splits stratified folds is boosted on the other folds
+    until the log-loss of the held out fold has not improved for
+    early_stopping_rounds rounds (max_rounds at most); the final model is
+    then fitted on all the rows with the mean of the best iterations.
+
+    Arguments:
+    params -- override META_PARAMS (and random_state, seed by default)
+    Returns:
+    gbm -- the fitted XGBClassifier
+    summary -- {'rounds', 'fold_rounds', 'fold_scores' (held out log-loss), 'fit_time' (seconds, folds included)}
+    """
+    import xgboost as xgb
+    from sklearn.model_selection import StratifiedKFold
+
+    x_train, y_train = np.asarray(x_train), np.asarray(y_train)
+    params = dict(META_PARAMS, **dict({'random_state': seed}, **params))
+    start = time.perf_counter()
+    rounds, scores = [], []
+    for train_index, test_index in StratifiedKFold(n_splits, shuffle=True, random_state=seed).split(x_train, y_train):
+        model = xgb.XGBClassifier(n_estimators=max_rounds, early_stopping_rounds=early_stopping_rounds,
+                                  eval_metric='logloss', **params)
+        model.fit(x_train[train_index], y_train[train_index],
+                  eval_set=[(x_train[test_index], y_train[test_index])], verbose=False)
+        rounds.append(model.best_iteration + 1)
+        scores.append(model.best_score)
+
+    gbm = xgb.XGBClassifier(n_estimators=int(round(np.mean(rounds))), **params).fit(x_train, y_train)
+    summary = {'rounds': gbm.n_estimators, 'fold_rounds': rounds, 'fold_scores': scores,
+               'fit_time': time.perf_counter() - start}
+    return gbm, summary
+
+
+def benchmark(workers=4, n_estimators=100):
+    from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier, GradientBoostingClassifier
+    from sklearn.model_selection import KFold
+    from preprocessing import after_preprocessing
+    import pandas as pd
+
+    data = after_preprocessing()
+    x_train, x_test = data[:891].to_numpy(), data[891:].to_numpy()
+    y_train = pd.read_csv('./datasets/train.csv').Survived.to_numpy()
+    models = {'rf': RandomForestClassifier(n_estimators=n_estimators, random_state=0),
+              'et': ExtraTreesClassifier(n_estimators=n_estimators, random_state=0),
+              'gb': GradientBoostingClassifier(n_estimators=n_estimators, random_state=0)}
+    folds = list(KFold(n_splits=5).split(x_train))
+    cache_dir = os.path.join(OOF_DIR, 'benchmark')
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+    for label, kwargs in [('serial, no cache', dict(use_cache=False)),
+                          ('{0} workers, cold'.format(workers), dict(workers=workers)),
+                          ('{0} workers, cached'.format(workers), dict(workers=workers))]:
+        start = time.time()
+        oof_predictions(models, x_train, y_train, x_test, folds, proba=True, cache_dir=cache_dir, **kwargs)
+        print("{0:22} {1:.2f}s".format(label, time.time() - start))
+
+    import xgboost as xgb
+    oof = oof_predictions(models, x_train, y_train, x_test, folds, proba=True, cache_dir=cache_dir)
+    meta_train = np.concatenate([oof[name][0] for name in models], axis=1)
+    start = time.time()
+    xgb.XGBClassifier(n_estimators=2000, **dict(META_PARAMS, tree_method='exact')).fit(meta_train, y_train)
+    print("meta-model, 2000 exact rounds       {0:.2f}s".format(time.time() - start))
+    gbm, summary = fit_meta(meta_train, y_train)
+    print("meta-model, early stopped (hist)    {0:.2f}s   {1} rounds (folds: {2})".format(
+        summary['fit_time'], summary['rounds'], summary['fold_rounds']))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,127 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from family_groups import group_table, combine_group_tables
+
+
+GROUP_COLUMNS = ['Name', 'Sex', 'Ticket']
+# read as text in every chunk: a chunk whose tickets are all numeric would otherwise
+# get an int64 Ticket column, whose family keys never match the string ones
+TEXT_COLUMNS = ['Name', 'Sex', 'Ticket', 'Cabin', 'Embarked']
+# chunk tables held before they are merged into the family table
+COMBINE_EVERY = 16
+
+
+def read_chunks(paths, chunksize, usecols=None):
+    # passengers of all the given CSV files, chunksize rows at a time
+    for path in paths:
+        columns = pd.read_csv(path, nrows=0).columns
+        wanted = None if usecols is None else [c for c in usecols if c in columns]
+        dtype = {c: str for c in TEXT_COLUMNS if c in columns and (wanted is None or c in wanted)}
+        for chunk in pd.read_csv(path, chunksize=chunksize, usecols=wanted, dtype=dtype):
+            yield chunk
+
+
+def stream_group_table(paths, chunksize=100000, pipeline=None):
+    """
+    First, light pass over the manifest: only Name / Sex / Ticket (/ Survived)
+    are read, chunk by chunk, and folded into the (surname, ticket) family table.
+
+    Known outcomes of the fit manifest of `pipeline` are merged in, so a family
+    member whose fate is known from training also flags the streamed passengers.
+
+    Returns:
+    table -- family_groups.group_table of the whole manifest
+    n_rows -- number of passengers in the manifest
+    """
+    parts = []
+    n_rows = 0
+    for chunk in read_chunks(paths, chunksize, GROUP_COLUMNS + ['Survived']):
+        n_rows += len(chunk)
+        parts.append(group_table(chunk['Name'], chunk['Sex'], chunk['Ticket'], chunk.get('Survived')))
+        # merged COMBINE_EVERY chunks at a time, not on every chunk (the table keeps first-seen order)
+        if len(parts) > COMBINE_EVERY:
+            parts = [combine_group_tables(parts)]
+    table = None
+    if parts:
+        table = parts[0] if len(parts) == 1 else combine_group_tables(parts)
+
+    if pipeline is not None and table is not None:
+        known = pipeline.groups_.reindex(table.index)
+        table['female_dead'] |= known['female_dead'].fillna(False).to_numpy(dtype=bool)
+        table['female_alive'] |= known['female_alive'].fillna(False).to_numpy(dtype=bool)
+    return table, n_rows
+
+
+def stream_features(pipeline, paths, out_path, chunksize=100000, dtype=np.float32):
+    """
+    Writes the feature matrix of a manifest too large for memory to a
+    memory-mappable .npy file, chunksize passengers at a time.
+
+    Only one chunk, its features and the family table are in memory at any time;
+    group features are resolved through the table of stream_group_table(), so a
+    family split over several chunks is still seen as one family. The column
+    names go to out_path + '.columns.json'.
+
+    Arguments:
+    pipeline -- fitted pipeline.FeaturePipeline
+    paths -- CSV files of the manifest (train.csv layout, Survived optional)
+    Returns:
+    read-only memory map of the (n_rows, n_features) matrix
+    """
+    groups, n_rows = stream_group_table(paths, chunksize, pipeline)
+
+    matrix = np.lib.format.open_memmap(out_path, mode='w+', dtype=dtype, shape=(n_rows, len(pipeline.columns_)))
+    start = 0
+    for chunk in read_chunks(paths, chunksize):
+        features = pipeline.transform(chunk, groups=groups)
+        matrix[start:start + len(chunk)] = features.to_numpy(dtype=dtype)
+        start += len(chunk)
+    matrix.flush()
+    del matrix
+
+    with open(out_path + '.columns.json', 'w') as f:
+        json.dump([str(c) for c in pipeline.columns_], f)
+    return np.load(out_path, mmap_mode='r')
+
+
+def verify(chunksize=7, path='./datasets/cache/verify_manifest.npy'):
+    """
+    Streams train.csv + test.csv at a small chunksize (so that some chunks hold
+    only numeric tickets) and compares the matrix with FeaturePipeline.transform
+    of the whole manifest in memory. Returns the number of differing cells.
+    """
+    from pipeline import fit_manifest_pipeline, TRAIN_PATH, TEST_PATH
+
+    pipeline, data = fit_manifest_pipeline()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    matrix = stream_features(pipeline, [TRAIN_PATH, TEST_PATH], path, chunksize)
+    expected = pipeline.transform(data).to_numpy(dtype=matrix.dtype)
+    different = int((matrix != expected).sum())
+    print("chunksize = {0}   {1} differing cells".format(chunksize, different))
+    return different
+
+
+def benchmark(n=10 ** 6, chunksize=100000, path='./datasets/cache/synthetic_manifest.csv'):
+    from pipeline import fit_manifest_pipeline
+
+    pipeline, data = fit_manifest_pipeline()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rng = np.random.RandomState(0)
+    big = data.iloc[rng.randint(0, len(data), n)].reset_index(drop=True)
+    big['PassengerId'] = np.arange(n) + 10 ** 6
+    big.to_csv(path, index=False)
+    del big
+
+    start = time.time()
+    matrix = stream_features(pipeline, [path], path.replace('.csv', '.npy'), chunksize)
+    print("rows = {0}   chunksize = {1}   {2:.1f}s   shape = {3}".format(n, chunksize, time.time() - start, matrix.shape))
+
+
+if __name__ == '__main__':
+    verify()
+    benchmark()
@@ -0,0 +1,59 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+
+_SEPARATORS = re.compile(r'[./]')
+_TOKENS = re.compile(r'\S+')
+
+
+def parse_ticket(ticket, missing='XXX'):
+    """
+    Splits one ticket string into (prefix, first letter, numeric part).
+
+    "A/5 21171"  -> ('A5', 'A', 21171)
+    "113803"     -> (missing, 'X', 113803)
+    "LINE"       -> ('LINE', 'L', nan)
+    """
+    if not isinstance(ticket, str):
+        return missing, missing[0], np.nan
+    tokens = _TOKENS.findall(_SEPARATORS.sub('', ticket))
+    prefix = next((t for t in tokens if not t.isdigit()), missing)
+    number = int(tokens[-1]) if tokens and tokens[-1].isdigit() else np.nan
+    return prefix, prefix[0], number
+
+
+def parse_tickets(tickets, missing='XXX'):
+    """
+    Vectorized parse_ticket: tickets repeat across family members, so only
+    the distinct values are parsed and the results are broadcast back by code.
+
+    Returns:
+    DataFrame with 'prefix', 'letter' and 'number' columns, indexed like tickets
+    """
+    codes, uniques = pd.factorize(tickets)
+    parsed = [parse_ticket(t, missing) for t in uniques]
+    parsed.append(parse_ticket(None, missing))  # code -1 (NaN ticket) picks the last entry
+
+    columns = pd.DataFrame()
+    columns['prefix'] = np.array([p[0] for p in parsed], dtype=object)[codes]
+    columns['letter'] = np.array([p[1] for p in parsed], dtype=object)[codes]
+    columns['number'] = np.array([p[2] for p in parsed], dtype=np.float64)[codes]
+    columns.index = tickets.index
+    return columns
+
+
+def merge_prefixes(prefixes, groups):
+    """
+    Collapses ticket prefixes into groups, e.g. {'AAA': ['SWPP', 'SC'], ...};
+    prefixes not listed in any group are kept as they are.
+    """
+    group_of = {}
+    for group, members in groups.items():
+        for member in members:
+            group_of.setdefault(member, group)  # first group wins, like chained replace calls
+
+    codes, uniques = pd.factorize(prefixes)
+    lookup = np.array([group_of.get(u, u) for u in uniques] + [np.nan], dtype=object)
+    return pd.Series(lookup[codes], index=prefixes.index, name=prefixes.name)
@@ -0,0 +1,130 @@
+import hashlib
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# title -> group tables, titles that are not listed keep their own name (unless strict)
+
+# feature_handling.py and ensemble.py: uncommon titles collapse into 'Rare'
+RARE_TITLES = dict(
+    [(t, 'Rare') for t in ['Lady', 'the Countess', 'Capt', 'Col', 'Don', 'Dr', 'Major', 'Rev', 'Sir', 'Jonkheer', 'Dona']] +
+    [('Mlle', 'Miss'), ('Ms', 'Miss'), ('Mme', 'Mrs')]
+)
+
+# Analysis.py's Title_Dictionary
+SOCIAL_TITLES = {
+    "Capt":       "Officer",
+    "Col":        "Officer",
+    "Major":      "Officer",
+    "Jonkheer":   "Royalty",
+    "Don":        "Royalty",
+    "Sir" :       "Royalty",
+    "Dr":         "Officer",
+    "Rev":        "Officer",
+    "the Countess":"Royalty",
+    "Dona":       "Royalty",
+    "Mme":        "Mrs",
+    "Mlle":       "Miss",
+    "Ms":         "Mrs",
+    "Mr" :        "Mr",
+    "Mrs" :       "Mrs",
+    "Miss" :      "Miss",
+    "Master" :    "Master",
+    "Lady" :      "Royalty"
+}
+
+
+def grouping(groups):
+    # {group: [titles]} (the layout of config.PIPELINE_CONFIG['title_groups']) -> {title: group}
+    table = {}
+    for group, members in groups.items():
+        for member in members:
+            table.setdefault(member, group)
+    return table
+
+
+def parse_title(name):
+    # 'Braund, Mr. Owen Harris' -> 'Mr', 'Rothes, the Countess. of (...)' -> 'the Countess'
+    return name.split(',')[1].split('.')[0].strip()
+
+
+# parsed titles of the last few manifests, by content hash of the names
+_memo = {}
+_MEMO_SIZE = 8
+
+
+def _digest(names):
+    hashes = pd.util.hash_pandas_object(names, index=False).to_numpy()
+    return hashlib.sha1(hashes.tobytes()).hexdigest()
+
+
+def parse_titles(names):
+    """
+    Titles of a Series of names as a categorical Series (same index).
+
+    The distinct names are factorized and only those are parsed, with one
+    str.extract. The result is memoized per content hash of the names, so the
+    pipelines that parse the same manifest share the work.
+    """
+    names = pd.Series(names) if not isinstance(names, pd.Series) else names
+    key = _digest(names)
+    if key not in _memo:
+        codes, uniques = pd.factorize(names)
+        parsed = pd.Series(uniques).str.extract(r'^[^,]*,([^.]*)', expand=False).str.strip()
+        parsed_codes, categories = pd.factorize(parsed, sort=True)
+        codes = np.where(codes >= 0, parsed_codes[np.maximum(codes, 0)], -1)
+        if len(_memo) >= _MEMO_SIZE:
+            _memo.pop(next(iter(_memo)))
+        _memo[key] = pd.Categorical.from_codes(codes, categories)
+    return pd.Series(_memo[key].copy(), index=names.index, name=names.name)
+
+
+def group_titles(titles, table, strict=False):
+    """
+    Maps the titles (categorical Series of parse_titles) to their group in table,
+    working on the categories only. Titles missing from the table keep their
+    name, or become NaN with strict=True (like Series.map(table)).
+    The categories of the result are sorted.
+    """
+    titles = titles if isinstance(titles.dtype, pd.CategoricalDtype) else titles.astype('category')
+    categories = titles.cat.categories
+    groups = [table.get(t, np.nan if strict else t) for t in categories]
+    new_categories = sorted(set(g for g in groups if g == g))
+    lookup = np.append(pd.Index(new_categories).get_indexer(groups), -1)  # -1: missing title stays missing
+    codes = lookup[titles.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, new_categories), index=titles.index, name=titles.name)
+
+
+def title_codes(names, table, strict=False):
+    # grouped titles of names: (integer codes, -1 for none, and their categories)
+    grouped = group_titles(parse_titles(names), table, strict).cat
+    return grouped.codes.to_numpy(), list(grouped.categories)
+
+
+def benchmark(n=10 ** 6):
+    names = pd.read_csv('./datasets/train.csv', usecols=['Name']).Name
+    names = names.iloc[np.random.RandomState(0).randint(0, len(names), n)].reset_index(drop=True)
+
+    start = time.time()
+    reference = names.map(parse_title)
+    reference = reference.replace([t for t, g in RARE_TITLES.items() if g == 'Rare'], 'Rare')
+    reference = reference.replace(['Mlle', 'Ms'], 'Miss').replace('Mme', 'Mrs')
+    mapped = time.time() - start
+
+    _memo.clear()
+    start = time.time()
+    grouped = group_titles(parse_titles(names), RARE_TITLES)
+    vectorized = time.time() - start
+
+    start = time.time()
+    group_titles(parse_titles(names), RARE_TITLES)
+    memoized = time.time() - start
+
+    print("rows = {0}   map + replace: {1:.2f}s   parse_titles: {2:.2f}s   memoized: {3:.2f}s   same: {4}".format(
+        n, mapped, vectorized, memoized, bool((grouped.astype(object) == reference).all())))
+
+
+if __name__ == '__main__':
+    benchmark()
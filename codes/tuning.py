@@ -0,0 +1,394 @@
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold, ParameterGrid, ParameterSampler
+
+from cache import CACHE_DIR, array_digest, config_digest
+
+
+RESULTS_PATH = os.path.join(CACHE_DIR, "tuning", "results.jsonl")
+
+
+def _staged_predictions(model, X, sizes):
+    """
+    {size: predictions of the first `size` members of a fitted ensemble}.
+
+    Forests average the class probabilities of their trees, so a running sum
+    over model.estimators_ gives every smaller forest; boosting models have
+    staged_predict. Sizes beyond the stages the model actually built get
+    its final predictions. Other models are not handled here (see sweep_n_estimators).
+    """
+    wanted = set(sizes)
+    staged, last = {}, None
+    if hasattr(model, 'staged_predict'):
+        for i, last in enumerate(model.staged_predict(X), 1):
+            if i in wanted:
+                staged[i] = last
+    else:
+        total = np.zeros((len(X), len(model.classes_)))
+        for i, tree in enumerate(model.estimators_, 1):
+            total += tree.predict_proba(X)
+            if i in wanted:
+                staged[i] = model.classes_[np.argmax(total, axis=1)]
+        last = model.classes_[np.argmax(total, axis=1)]
+    # boosting that stopped early (n_iter_no_change, AdaBoost on a perfect fit) has fewer
+    # stages than asked for: n_estimators=size would stop at the same last stage
+    for size in wanted:
+        if size not in staged:
+            staged[size] = last
+    return staged
+
+
+def _warm_start_predictions(model, X_train, y_train, X_test, sizes):
+    # ensembles without a way to look at their first members: grow them with warm_start
+    model.set_params(warm_start=True)
+    staged = {}
+    for size in sorted(sizes):
+        model.set_params(n_estimators=size)
+        model.fit(X_train, y_train)
+        staged[size] = model.predict(X_test)
+    return staged
+
+
+def sweep_n_estimators(model, X, y, n_estimators, cv=5, scoring=accuracy_score, refit=True):
+    """
+    Cross validated score of model for every value of n_estimators, for about
+    the cost of fitting the largest one once per fold.
+
+    Every fold fits a single ensemble of max(n_estimators) members and scores
+    all its smaller prefixes: forests through their trees' probabilities,
+    gradient boosting / AdaBoost through staged_predict, other ensembles by
+    growing one model with warm_start. With a fixed random_state a prefix is
+    exactly the model that n_estimators=size would fit, so the scores are the
+    ones GridSearchCV(model, {'n_estimators': ...}, cv=cv) finds.
+
+    Arguments:
+    cv -- number of stratified folds (GridSearchCV's default split) or a splitter
+    Returns:
+    model -- a clone with the best n_estimators, fitted on X, y if refit
+    table -- DataFrame, one row per n_estimators: the score of every fold, mean and std
+    """
+    X = X.values if hasattr(X, 'values') else np.asarray(X)
+    y = y.values if hasattr(y, 'values') else np.asarray(y)
+    sizes = sorted(set(n_estimators))
+    splitter = StratifiedKFold(cv) if isinstance(cv, int) else cv
+
+    scores = {size: [] for size in sizes}
+    for train_index, test_index in splitter.split(X, y):
+        fold_model = clone(model)
+        if hasattr(model, 'staged_predict') or isinstance(model, (RandomForestClassifier, ExtraTreesClassifier)):
+            fold_model.set_params(n_estimators=sizes[-1])
+            fold_model.fit(X[train_index], y[train_index])
+            staged = _staged_predictions(fold_model, X[test_index], sizes)
+        else:
+            staged = _warm_start_predictions(fold_model, X[train_index], y[train_index], X[test_index], sizes)
+        for size in sizes:
+            scores[size].append(scoring(y[test_index], staged[size]))
+
+    table = pd.DataFrame(scores).T
+    table.columns = ['fold_{0}'.format(i) for i in range(table.shape[1])]
+    table.index.name = 'n_estimators'
+    table['mean'] = table.mean(axis=1)
+    table['std'] = table.drop(columns='mean').std(axis=1, ddof=0)
+
+    best = clone(model).set_params(n_estimators=int(table['mean'].idxmax()))
+    if refit:
+        best.fit(X, y)
+    return best, table
+
+
+def grid_sweep(model, parameters, X, y, cv=5, scoring=accuracy_score, refit=True):
+    """
+    GridSearchCV over parameters where n_estimators is not refitted per value:
+    every combination of the other parameters gets one sweep_n_estimators.
+
+    Returns the best model (fitted if refit) and a DataFrame with the mean / std
+    score of every (combination, n_estimators), best first.
+    """
+    parameters = dict(parameters)
+    n_estimators = parameters.pop('n_estimators')
+    rows = []
+    for params in ParameterGrid(parameters):
+        _, table = sweep_n_estimators(clone(model).set_params(**params), X, y, n_estimators, cv, scoring, refit=False)
+        for size, row in table.iterrows():
+            rows.append(dict(params, n_estimators=size, mean=row['mean'], std=row['std']))
+    results = pd.DataFrame(rows).sort_values('mean', ascending=False, kind='mergesort').reset_index(drop=True)
+
+    best_params = {k: v for k, v in results.iloc[0].items() if k not in ('mean', 'std')}
+    best_params['n_estimators'] = int(best_params['n_estimators'])
+    best = clone(model).set_params(**best_params)
+    if refit:
+        best.fit(X, y)
+    return best, results
+
+
+class ResultStore(object):
+    """
+    Append-only JSON lines file of every evaluated configuration, read back
+    on creation so a repeated or interrupted search skips what it already knows.
+    Each line is one evaluate() result plus its key.
+    """
+
+    def __init__(self, path=RESULTS_PATH):
+        self.path = path
+        self.results = {}
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.results[record['key']] = record
+
+    def get(self, key):
+        return self.results.get(key)
+
+    def add(self, record):
+        self.results[record['key']] = record
+        if self.path is not None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record, default=str) + '\n')
+
+
+class Budget(object):
+    # wall-clock seconds and / or number of model fits a search may spend (None: no limit)
+
+    def __init__(self, seconds=None, fits=None):
+        self.seconds = seconds
+        self.fits = fits
+        self.start = time.time()
+        self.used = 0
+
+    def spend(self, fits):
+        self.used += fits
+
+    def exhausted(self):
+        if self.seconds is not None and time.time() - self.start >= self.seconds:
+            return True
+        return self.fits is not None and self.used >= self.fits
+
+
+def evaluate(model, params, X, y, resource=None, resource_type='n_estimators', cv=5, scoring=accuracy_score, seed=0):
+    """
+    Cross validated score of model with params, given `resource`: its
+    n_estimators (resource_type='n_estimators') or the number of training rows
+    of every fold (resource_type='samples', a seeded random subsample).
+    A configuration that fails to fit scores NaN, like GridSearchCV's error_score.
+    """
+    model = clone(model).set_params(**params)
+    if resource is not None and resource_type == 'n_estimators':
+        model.set_params(n_estimators=int(resource))
+    splitter = StratifiedKFold(cv) if isinstance(cv, int) else cv
+    rng = np.random.RandomState(seed)
+
+    scores = []
+    start = time.time()
+    try:
+        for train_index, test_index in splitter.split(X, y):
+            if resource is not None and resource_type == 'samples' and resource < len(train_index):
+                train_index = np.sort(rng.choice(train_index, int(resource), replace=False))
+            model.fit(X[train_index], y[train_index])
+            scores.append(scoring(y[test_index], model.predict(X[test_index])))
+        error = None
+    except Exception as e:  # a bad combination of parameters, not a bug of the search
+        scores, error = [np.nan], repr(e)
+    return {'params': params, 'resource': resource, 'score': float(np.mean(scores)), 'std': float(np.std(scores)),
+            'fits': len(scores), 'fit_time': time.time() - start, 'error': error}
+
+
+def _pool(workers):
+    methods = multiprocessing.get_all_start_methods()
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork' if 'fork' in methods else None))
+
+
+def _evaluate_all(model, candidates, X, y, resource, resource_type, cv, scoring, seed, workers, store, budget, data_key):
+    """
+    evaluate() every candidate at resource: stored results are reused, the others
+    run on `workers` processes (at most `workers` in flight, so nothing new is
+    started once the budget is spent) and are stored as soon as they finish.
+    Returns the results of the candidates that could be evaluated, in order.
+    """
+    def key(params):
+        return config_digest({'data': data_key, 'model': type(model).__name__, 'base': model.get_params(),
+                              'params': params, 'resource': resource, 'resource_type': resource_type,
+                              'cv': str(cv), 'scoring': getattr(scoring, '__name__', str(scoring)), 'seed': seed})
+
+    results = {}
+    pending = []
+    for i, params in enumerate(candidates):
+        stored = store.get(key(params))
+        if stored is not None:
+            results[i] = stored
+        else:
+            pending.append(i)
+
+    def finish(i, result):
+        result['key'] = key(candidates[i])
+        store.add(result)
+        budget.spend(result['fits'])
+        results[i] = result
+
+    if workers <= 1:
+        for i in pending:
+            if budget.exhausted():
+                break
+            finish(i, evaluate(model, candidates[i], X, y, resource, resource_type, cv, scoring, seed))
+    elif pending:
+        with _pool(workers) as executor:
+            running = {}
+            while pending or running:
+                while pending and len(running) < workers and not budget.exhausted():
+                    i = pending.pop(0)
+                    running[executor.submit(evaluate, model, candidates[i], X, y, resource, resource_type,
+                                            cv, scoring, seed)] = i
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(running.pop(future), future.result())
+    return [results[i] for i in sorted(results)]
+
+
+def _ranked(results):
+    # best first, NaN (failed) last, ties keep the candidate order
+    return sorted(results, key=lambda r: -r['score'] if r['score'] == r['score'] else np.inf)
+
+
+def _search_frame(rows):
+    frame = pd.DataFrame([dict(r['params'], resource=r['resource'], score=r['score'], std=r['std'],
+                               fit_time=r['fit_time'], error=r['error']) for r in rows])
+    return frame.sort_values('score', ascending=False, kind='mergesort').reset_index(drop=True)
+
+
+def _prepare(X, y):
+    X = X.values if hasattr(X, 'values') else np.asarray(X)
+    y = y.values if hasattr(y, 'values') else np.asarray(y)
+    return X, y, array_digest(X, y)
+
+
+def _finish(model, best, X, y, resource, resource_type, refit):
+    if best is None:
+        raise ValueError("the budget was spent before any configuration was evaluated")
+    model = clone(model).set_params(**best['params'])
+    if resource is not None and resource_type == 'n_estimators':
+        model.set_params(n_estimators=int(resource))
+    if refit:
+        model.fit(X, y)
+    return model
+
+
+def random_search(model, parameters, X, y, n_iter=60, cv=5, scoring=accuracy_score, seed=0, workers=1,
+                  seconds=None, max_fits=None, store=RESULTS_PATH, refit=True):
+    """
+    n_iter configurations drawn from parameters (lists, or scipy distributions,
+    as for RandomizedSearchCV), evaluated until the wall-clock (seconds) or
+    fit-count (max_fits) budget is spent.
+
+    Every evaluation is appended to the JSON lines results store (store=None:
+    keep nothing), so repeating or resuming a search only runs new configurations.
+
+    Returns the best model (fitted on X, y if refit) and a DataFrame of all the
+    evaluated configurations, best first. Raises ValueError when the budget
+    is spent before any configuration is evaluated.
+    """
+    X, y, data_key = _prepare(X, y)
+    candidates = list(ParameterSampler(parameters, n_iter, random_state=seed))
+    results = _evaluate_all(model, candidates, X, y, None, None, cv, scoring, seed, workers,
+                            ResultStore(store), Budget(seconds, max_fits), data_key)
+    best = _ranked(results)[0] if results else None
+    return _finish(model, best, X, y, None, None, refit), _search_frame(results)
+
+
+def successive_halving(model, parameters, X, y, n_candidates=None, factor=3, resource_type='n_estimators',
+                       min_resource=None, max_resource=None, cv=5, scoring=accuracy_score, seed=0, workers=1,
+                       seconds=None, max_fits=None, store=RESULTS_PATH, refit=True):
+    """
+    Successive halving: all the candidates are evaluated on a small resource,
+    the best 1 / factor of them go on to factor times more resource, until one
+    is left or max_resource is reached. Poor configurations are dropped after
+    costing only a few trees (resource_type='n_estimators') or a few training
+    rows (resource_type='samples').
+
+    Arguments:
+    parameters -- lists / distributions, a 'n_estimators' entry is ignored when it is the resource
+    n_candidates -- configurations sampled from parameters (None: the whole grid)
+    min_resource, max_resource -- n_estimators (default 10 / 100) or rows (default 30 / all)
+    seconds, max_fits -- budget; when spent, the best candidate of the last
+                         round that was evaluated is returned (ValueError if
+                         the first round got nothing done)
+    store -- JSON lines results store, see random_search()
+    Returns:
+    the best model (fitted on X, y if refit, with max_resource trees) and a
+    DataFrame of every evaluation with its resource, best first
+    """
+    X, y, data_key = _prepare(X, y)
+    parameters = dict(parameters)
+    if resource_type == 'n_estimators':
+        parameters.pop('n_estimators', None)
+        min_resource = 10 if min_resource is None else min_resource
+        max_resource = 100 if max_resource is None else max_resource
+    else:
+        min_resource = 30 if min_resource is None else min_resource
+        max_resource = len(X) if max_resource is None else max_resource
+
+    if n_candidates is None:
+        candidates = list(ParameterGrid(parameters))
+    else:
+        candidates = list(ParameterSampler(parameters, n_candidates, random_state=seed))
+    store, budget = ResultStore(store), Budget(seconds, max_fits)
+
+    # with n candidates, enough rounds that about one is left at max_resource
+    rounds = max(1, int(math.ceil(math.log(len(candidates), factor))) + 1) if len(candidates) > 1 else 1
+    resources = np.geomspace(min_resource, max_resource, rounds) if rounds > 1 else [max_resource]
+    resources = [int(round(r)) for r in resources]
+
+    rows = []
+    best, resource = None, None
+    for r in resources:
+        results = _evaluate_all(model, candidates, X, y, r, resource_type, cv, scoring, seed, workers,
+                                store, budget, data_key)
+        if not results:
+            break
+        rows += results
+        ranked = _ranked(results)
+        best, resource = ranked[0], r
+        if budget.exhausted() or len(ranked) == 1:
+            break
+        candidates = [result['params'] for result in ranked[:max(1, len(ranked) // factor)]]
+
+    final_resource = resource if resource_type == 'n_estimators' else None
+    return _finish(model, best, X, y, final_resource, resource_type, refit), _search_frame(rows)
+
+
+def benchmark(n_estimators=(10, 20, 30, 40, 50, 60, 70, 80, 90, 100)):
+    from sklearn.ensemble import GradientBoostingClassifier
+    from sklearn.model_selection import GridSearchCV
+    from preprocessing import after_preprocessing
+
+    X = after_preprocessing()[:891].to_numpy()  # mixed int / str column names
+    y = pd.read_csv('./datasets/train.csv').Survived
+    for model in [RandomForestClassifier(random_state=0), GradientBoostingClassifier(random_state=0)]:
+        start = time.time()
+        grid = GridSearchCV(model, {'n_estimators': list(n_estimators)}, scoring='accuracy').fit(X, y)
+        grid_time = time.time() - start
+
+        start = time.time()
+        best, table = sweep_n_estimators(model, X, y, n_estimators)
+        sweep_time = time.time() - start
+
+        same = np.allclose(grid.cv_results_['mean_test_score'], table['mean'].to_numpy())
+        print("{0:28} GridSearchCV {1:.2f}s   sweep {2:.2f}s   same scores: {3}   best n_estimators = {4}".format(
+            type(model).__name__, grid_time, sweep_time, same, best.n_estimators))
+
+
+if __name__ == '__main__':
+    benchmark()
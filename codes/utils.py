@@ -1,9 +1,7 @@
 import numpy as np
-import math
 import pandas as pd
 import seaborn as sns
 import numpy as np
-import tensorflow as tf
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler, Imputer 
 from sklearn.impute import SimpleImputer
@@ -11,61 +9,35 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.svm import SVC
 import warnings
 
+from batching import mini_batches
+from imputation import AgeImputer
+from kernels import relu, sigmoid as _sigmoid
 
 
 
-import os
-os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # ignoring warnings
 
 
 def ReLu(x):
-    return np.maximum(0, x)
+    return relu(x)
 
 def sigmoid(z):
-    x = tf.placeholder(tf.float32, name = 'x')
-    results = tf.sigmoid(x)
-    with tf.Session() as session:
-        results = session.run(results, feed_dict={x: z})
-    
-    return results
+    # numerically stable NumPy kernel (kernels.sigmoid), no TensorFlow session per call
+    return _sigmoid(z)
 
 
 def random_mini_batches(X, Y, mini_batch_size = 64, seed = 0):
     """
-    Creates a list of random minibatches from (X, Y)
+    Random minibatches of (X, Y), one at a time (batching.mini_batches): only
+    one batch is held in memory and each one is overwritten by the next, so
+    copy a batch to keep it.
     
     Arguments:
     X of shape (input size, m)
     Y of shape (1, m)
     Returns:
-    mini_batches -- list of synchronous (mini_batch_X, mini_batch_Y)
+    mini_batches -- generator of synchronous (mini_batch_X, mini_batch_Y)
     """
-    
-    m = X.shape[1]                
-    mini_batches = []
-    np.random.seed(seed)
-    
-    # Shuffle (X, Y)
-    permutation = list(np.random.permutation(m))
-    shuffled_X = X[:, permutation]
-    shuffled_Y = Y[:, permutation].reshape((Y.shape[0],m))
-
-    # Partition (shuffled_X, shuffled_Y). Minus the end case.
-    num_complete_minibatches = math.floor(m/mini_batch_size) # number of mini batches of size mini_batch_size in your partitionning
-    for k in range(0, num_complete_minibatches):
-        mini_batch_X = shuffled_X[:, k * mini_batch_size : k * mini_batch_size + mini_batch_size]
-        mini_batch_Y = shuffled_Y[:, k * mini_batch_size : k * mini_batch_size + mini_batch_size]
-        mini_batch = (mini_batch_X, mini_batch_Y)
-        mini_batches.append(mini_batch)
-    
-    # Handling the end case (last mini-batch < mini_batch_size)
-    if m % mini_batch_size != 0:
-        mini_batch_X = shuffled_X[:, num_complete_minibatches * mini_batch_size : m]
-        mini_batch_Y = shuffled_Y[:, num_complete_minibatches * mini_batch_size : m]
-        mini_batch = (mini_batch_X, mini_batch_Y)
-        mini_batches.append(mini_batch)
-    
-    return mini_batches
+    return mini_batches(X, Y, mini_batch_size, seed, axis=1)
 
 
 def normalizer(x):
@@ -93,22 +65,7 @@ def train_visulization():
     sns.boxplot(x='Pclass', y='Age', data=data)
 
 
-    def impute_age(cols):
-        Age=cols[0]
-        Pclass=cols[1]
-        
-        if pd.isnull(Age):
-            if Pclass==1:
-                return 37
-            elif Pclass==2:
-                return 29
-            else:
-                return 24
-        else:
-            return Age
-
-
-    data['Age']=data[['Age', 'Pclass']].apply(impute_age, axis=1)
+    data['Age'] = AgeImputer(by=('Pclass',)).fit_transform(data)
     sns.heatmap(data.isnull(), yticklabels=False, cbar=False, cmap='YlGnBu')
     
     data.drop('Cabin', axis=1, inplace=True)
@@ -143,22 +100,7 @@ def train_preprocessing():
         if data.loc[i,'Name'] != 0 and data.loc[i,'Name'] != 1 and data.loc[i,'Name'] != 2 :
             data.loc[i,'Name'] = 3
 
-    def impute_age(cols):
-        Age=cols[0]
-        Pclass=cols[1]
-        
-        if pd.isnull(Age):
-            if Pclass==1:
-                return 37
-            elif Pclass==2:
-                return 29
-            else:
-                return 24
-        else:
-            return Age
-
-
-    data['Age']=data[['Age', 'Pclass']].apply(impute_age, axis=1)
+    data['Age'] = AgeImputer(by=('Pclass',)).fit_transform(data)
     age_normalizer(data['Age'])
 
     data.dropna(inplace=True) #Dropping null values
@@ -179,20 +121,9 @@ def test_visualization():
     sns.heatmap(test.isnull(), yticklabels=False, cbar=False, cmap='YlGnBu')
     sns.boxplot(x='Pclass', y='Age', data=test)
 
-    def impute_age2(cols):
-        Age=cols[0]
-        Pclass=cols[1]
-        
-        if pd.isnull(Age):
-            if Pclass==1:
-                return 42
-            elif Pclass==2:
-                return 26
-            else:
-                return 24
-        else:
-            return Age
-    test['Age']=test[['Age', 'Pclass']].apply(impute_age2, axis=1)
+    # medians learnt on the training set are reused for the test set
+    age_imputer = AgeImputer(by=('Pclass',)).fit(pd.read_csv("./datasets/train.csv"))
+    test['Age'] = age_imputer.transform(test)
 
 
     imputer = Imputer(missing_values = 'NaN', strategy = 'mean', axis = 0) #fixing Fare missing values
@@ -218,20 +149,9 @@ def test_visualization():
 def test_preprocessing():
     test=pd.read_csv('./datasets/test.csv')
 
-    def impute_age(cols):
-        Age=cols[0]
-        Pclass=cols[1]
-        
-        if pd.isnull(Age):
-            if Pclass==1:
-                return 42
-            elif Pclass==2:
-                return 26
-            else:
-                return 24
-        else:
-            return Age
-    test['Age']=test[['Age', 'Pclass']].apply(impute_age, axis=1)
+    # medians learnt on the training set are reused for the test set
+    age_imputer = AgeImputer(by=('Pclass',)).fit(pd.read_csv("./datasets/train.csv"))
+    test['Age'] = age_imputer.transform(test)
     age_normalizer(test['Age'])
 
 
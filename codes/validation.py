@@ -0,0 +1,199 @@
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import KFold, StratifiedKFold, RepeatedKFold, RepeatedStratifiedKFold
+
+try:
+    import resource
+except ImportError:  # Windows: no peak memory
+    resource = None
+
+
+class CVResult(object):
+    """
+    Outcome of cross_validate() for one model: one entry per fold (repeat after
+    repeat) in scores, fit_times / predict_times (seconds) and peak_memory
+    (peak resident size in bytes of the process that ran the fold, so far).
+    """
+
+    def __init__(self, name, scores, fit_times, predict_times, peak_memory, wall_time):
+        self.name = name
+        self.scores = np.asarray(scores)
+        self.fit_times = np.asarray(fit_times)
+        self.predict_times = np.asarray(predict_times)
+        self.peak_memory = np.asarray(peak_memory)
+        self.wall_time = wall_time
+
+    @property
+    def mean(self):
+        return self.scores.mean()
+
+    @property
+    def std(self):
+        return self.scores.std()
+
+    def to_frame(self):
+        return pd.DataFrame({'score': self.scores, 'fit_time': self.fit_times,
+                             'predict_time': self.predict_times, 'peak_memory': self.peak_memory})
+
+    def summary(self):
+        return {'model': self.name, 'mean': self.mean, 'std': self.std, 'folds': len(self.scores),
+                'fit_time': self.fit_times.sum(), 'predict_time': self.predict_times.sum(),
+                'peak_memory': int(self.peak_memory.max()), 'wall_time': self.wall_time}
+
+    def __repr__(self):
+        return "CVResult({0}: {1:.4f} +- {2:.4f} over {3} folds, {4:.2f}s)".format(
+            self.name, self.mean, self.std, len(self.scores), self.wall_time)
+
+
+def splitter(n_splits=10, stratified=False, repeats=1, seed=None):
+    """
+    The sklearn splitter for the given options. seed=None keeps the rows in
+    order (plain KFold, like the original run_kfold); any other seed shuffles
+    reproducibly, and repeats > 1 (which needs a seed) reshuffles every repeat.
+    """
+    if repeats > 1:
+        if seed is None:
+            raise ValueError("repeated splits need a seed")
+        cls = RepeatedStratifiedKFold if stratified else RepeatedKFold
+        return cls(n_splits=n_splits, n_repeats=repeats, random_state=seed)
+    cls = StratifiedKFold if stratified else KFold
+    if seed is None:
+        return cls(n_splits=n_splits)
+    return cls(n_splits=n_splits, shuffle=True, random_state=seed)
+
+
+def _peak_memory():
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # bytes on macOS, kilobytes elsewhere
+
+
+def _fit_fold(model, X, y, train_index, test_index, scoring):
+    start = time.perf_counter()
+    model.fit(X[train_index], y[train_index])
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    predictions = model.predict(X[test_index])
+    predict_time = time.perf_counter() - start
+    return scoring(y[test_index], predictions), fit_time, predict_time, _peak_memory()
+
+
+# the matrices of the worker process, attached once from shared memory
+_worker = {}
+
+
+def _attach(x_name, x_shape, x_dtype, y_name, y_shape, y_dtype):
+    for key, name, shape, dtype in [('X', x_name, x_shape, x_dtype), ('y', y_name, y_shape, y_dtype)]:
+        memory = shared_memory.SharedMemory(name=name)
+        _worker[key + '_memory'] = memory  # keeps the mapping alive
+        _worker[key] = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+
+def _run_fold(model, train_index, test_index, scoring):
+    return _fit_fold(model, _worker['X'], _worker['y'], train_index, test_index, scoring)
+
+
+def _share(array):
+    memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf)[...] = array
+    return memory
+
+
+def _name(model):
+    return type(model).__name__
+
+
+def _named(models):
+    # {name: model} for a list: class names, with _2, _3... for repeated classes
+    named = {}
+    for model in models:
+        name, i = _name(model), 1
+        while name in named:
+            i += 1
+            name = "{0}_{1}".format(_name(model), i)
+        named[name] = model
+    return named
+
+
+def compare(models, X, y, n_splits=10, stratified=False, repeats=1, seed=None, workers=1,
+            scoring=accuracy_score):
+    """
+    Cross validates every model on the same folds and returns {name: CVResult}.
+
+    With workers > 1 all the (model, fold) fits are dispatched to one process
+    pool. X and y are copied once into shared memory, which the workers map
+    read-only; only the fold indices and an unfitted clone of the model are
+    sent per fold.
+
+    Arguments:
+    models -- estimators (a list, named by class, then Class_2, Class_3... for
+              repeated classes) or a {name: estimator} dict
+    X, y -- DataFrame / Series or arrays
+    n_splits, stratified, repeats, seed -- see splitter()
+    scoring -- scoring(y_true, y_pred), accuracy by default
+    """
+    models = models if isinstance(models, dict) else _named(models)
+    X = np.ascontiguousarray(X.values if hasattr(X, 'values') else X)
+    y = np.ascontiguousarray(y.values if hasattr(y, 'values') else y)
+    folds = list(splitter(n_splits, stratified, repeats, seed).split(X, y))
+    jobs = [(name, model, train_index, test_index) for name, model in models.items() for train_index, test_index in folds]
+
+    start = time.time()
+    if workers <= 1:
+        outcomes = [_fit_fold(clone(model), X, y, train_index, test_index, scoring)
+                    for name, model, train_index, test_index in jobs]
+    else:
+        x_memory, y_memory = _share(X), _share(y)
+        try:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            arguments = (x_memory.name, X.shape, X.dtype, y_memory.name, y.shape, y.dtype)
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=_attach, initargs=arguments) as executor:
+                futures = [executor.submit(_run_fold, clone(model), train_index, test_index, scoring)
+                           for name, model, train_index, test_index in jobs]
+                outcomes = [future.result() for future in futures]
+        finally:
+            for memory in (x_memory, y_memory):
+                memory.close()
+                memory.unlink()
+    wall_time = time.time() - start
+
+    results = {}
+    for name in models:
+        rows = [outcome for (job_name, _, _, _), outcome in zip(jobs, outcomes) if job_name == name]
+        scores, fit_times, predict_times, peaks = zip(*rows)
+        # the pool runs the models side by side, so each gets the wall time of the whole call
+        results[name] = CVResult(name, scores, fit_times, predict_times, peaks, wall_time)
+    return results
+
+
+def cross_validate(model, X, y, **kwargs):
+    # CVResult of a single model, same options as compare()
+    return compare({_name(model): model}, X, y, **kwargs)[_name(model)]
+
+
+def benchmark(workers=(1, 2, 4)):
+    from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+    from sklearn.linear_model import LogisticRegression
+    from preprocessing import after_preprocessing
+
+    X = after_preprocessing()[:891]
+    y = pd.read_csv('./datasets/train.csv').Survived
+    models = [RandomForestClassifier(random_state=0), GradientBoostingClassifier(random_state=0), LogisticRegression()]
+    for w in workers:
+        results = compare(models, X, y, stratified=True, repeats=2, seed=0, workers=w)
+        print("workers = {0}   {1:.2f}s   ".format(w, list(results.values())[0].wall_time) +
+              "   ".join("{0} {1:.4f}".format(name, r.mean) for name, r in results.items()))
+
+
+if __name__ == '__main__':
+    benchmark()